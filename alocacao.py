@@ -0,0 +1,87 @@
+import heapq
+
+import numpy as np
+
+# Gaps (em pontos percentuais) a menos disto de zero, ou uns dos outros, são
+# decididos com o patrimônio simulado exato da regra original
+TOLERANCIA = 1e-9
+
+# --- MOTOR DE ALOCAÇÃO (GULOSO POR MAIOR GAP) ---
+# Mesma regra do loop original: a cada papel comprado, o ativo com maior gap
+# (meta_pct - % simulado) que ainda cabe no caixa leva mais uma cota; empate fica
+# com o primeiro da carteira. Como comprar só move dinheiro do caixa para o ativo,
+# o patrimônio simulado é constante e o gap de um ativo só muda quando ele é
+# comprado: basta um heap de gaps em vez de recalcular o DataFrame inteiro.
+# No loop original o patrimônio é somado de novo a cada cota e carrega o erro de
+# arredondamento do caixa; quando o gap cai em cima do zero ou empata com outro,
+# a decisão é refeita com essa mesma soma para dar exatamente as mesmas compras.
+def calcular_compras(df, aporte):
+    caixa = aporte
+    df = df.copy()
+    df['comprar_qtd'] = 0
+    df['custo_total'] = 0.0
+    if df['meta_pct'].sum() == 0: return df, caixa
+    if caixa <= 0: return df, caixa
+    patr_sim = (df['qtde'] * df['preco_atual']).sum() + caixa
+    compras, custos, caixa = alocar(df['qtde'].tolist(), df['meta_pct'].tolist(), df['preco_atual'].tolist(), caixa, patr_sim)
+    df['comprar_qtd'] = compras
+    df['custo_total'] = custos
+    return df, caixa
+
+# Núcleo sobre listas/arrays, reaproveitado pelo backtest mês a mês
+def alocar(qtdes, metas, precos, caixa, patr_sim):
+    compras = [0] * len(precos)
+    custos = [0.0] * len(precos)
+    if patr_sim == 0: return compras, custos, caixa
+    heap = []
+    for i, (q, m, p) in enumerate(zip(qtdes, metas, precos)):
+        gap = m - (q * p / patr_sim) * 100
+        if gap > -TOLERANCIA: heap.append((-gap, i))
+    heapq.heapify(heap)
+    exato = _PatrimonioExato(qtdes, precos)
+
+    while heap and caixa > 0:
+        # Topo do heap: quem cabe no caixa com gap a menos de TOLERANCIA do maior
+        topo = []
+        while heap:
+            i = heap[0][1]
+            # O caixa só diminui: quem não cabe agora não cabe mais
+            if precos[i] > caixa:
+                heapq.heappop(heap)
+                continue
+            if topo and -heap[0][0] < -topo[0][0] - TOLERANCIA: break
+            topo.append(heapq.heappop(heap))
+        if not topo or -topo[0][0] <= -TOLERANCIA: break
+
+        if len(topo) == 1 and -topo[0][0] > TOLERANCIA: i = topo[0][1]
+        else:
+            i = exato.escolher([j for _, j in topo], metas, compras, caixa)
+            if i is None: break
+        for item in topo:
+            if item[1] != i: heapq.heappush(heap, item)
+
+        preco = precos[i]
+        compras[i] += 1
+        custos[i] += preco
+        caixa -= preco
+        gap = metas[i] - ((qtdes[i] + compras[i]) * preco / patr_sim) * 100
+        if gap > -TOLERANCIA: heapq.heappush(heap, (-gap, i))
+    return compras, custos, caixa
+
+class _PatrimonioExato:
+    # Recalcula o patrimônio como o loop original (soma das posições + soma das
+    # compras + caixa); só é chamado nos casos de fronteira
+    def __init__(self, qtdes, precos):
+        self.qtdes = qtdes
+        self.precos = np.asarray(precos, dtype=float)
+        self._base = None
+
+    def escolher(self, candidatos, metas, compras, caixa):
+        if self._base is None: self._base = (np.asarray(self.qtdes) * self.precos).sum()
+        patr_sim = self._base + (np.asarray(compras) * self.precos).sum() + caixa
+        if patr_sim == 0: return None
+        melhor, maior = None, 0.0
+        for i in sorted(candidatos):
+            gap = metas[i] - ((self.qtdes[i] + compras[i]) * self.precos[i] / patr_sim) * 100
+            if gap > maior: melhor, maior = i, gap
+        return melhor
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from constantes import SETORES, CARTEIRAS_PRONTAS
+
+# Módulo puro (sem Streamlit): recebe DataFrames indexados por ticker com as
+# colunas da carteira (qtde, meta_pct, pm, divs, teto) + preco_atual e devolve
+# tudo calculado; a interface só exibe.
+
+PROJECAO_ANUAL = 0.08
+
+
+# --- SETOR / LINK ---
+def obter_setor(ticker):
+    return SETORES.get(ticker.replace(".SA","").strip(), "Outros")
+
+def obter_link_investidor10(ticker):
+    tipo = "fundos-imobiliarios" if "11" in ticker else "acoes"
+    return f"https://investidor10.com.br/{tipo}/{ticker.lower()}/"
+
+def setores(tickers):
+    limpos = pd.Index(tickers, dtype=object).str.replace(".SA", "", regex=False).str.strip()
+    return pd.Series(limpos.map(SETORES), index=tickers).fillna("Outros")
+
+def links_investidor10(tickers):
+    idx = pd.Index(tickers, dtype=object)
+    tipo = np.where(idx.str.contains("11", regex=False), "fundos-imobiliarios", "acoes")
+    return pd.Series("https://investidor10.com.br/" + tipo + "/" + idx.str.lower() + "/", index=tickers)
+
+
+# --- MÉTRICAS POR ATIVO ---
+def _pct(numerador, denominador):
+    numerador = np.asarray(numerador, dtype=float)
+    denominador = np.asarray(denominador, dtype=float)
+    saida = np.zeros(numerador.shape)
+    np.divide(numerador, denominador, out=saida, where=denominador > 0)
+    return saida * 100
+
+def calcular_metricas(df):
+    df = df.copy()
+    df['total_atual'] = df['qtde'] * df['preco_atual']
+    df['total_inv'] = df['qtde'] * df['pm']
+    df['lucro_cota'] = df['total_atual'] - df['total_inv']
+    df['lucro_real'] = df['lucro_cota'] + df['divs']
+    df['rentab_pct'] = _pct(df['lucro_real'], df['total_inv'])
+    df['yoc_pct'] = _pct(df['divs'], df['total_inv'])
+    tickers = df.index.get_level_values(-1)
+    if 'setor' not in df: df['setor'] = setores(tickers).to_numpy()
+    df['link_analise'] = links_investidor10(tickers).to_numpy()
+    return df
+
+def oportunidades(df):
+    # Alerta do sniper: preço atual no teto ou abaixo dele
+    return df[(df['teto'] > 0) & (df['preco_atual'] <= df['teto'])]
+
+
+# --- RESUMO DA CARTEIRA ---
+def resumo(df):
+    patr = df['total_atual'].sum()
+    lucro = df['lucro_real'].sum()
+    return {
+        "patrimonio": patr,
+        "lucro_real": lucro,
+        "lucro_pct": (lucro / patr * 100) if patr > 0 else 0.0,
+        "total_investido": df['total_inv'].sum(),
+        "projecao_anual": patr * PROJECAO_ANUAL,
+    }
+
+
+# --- AGREGAÇÕES (SETOR / ESTRATÉGIA) ---
+def alocacao_por_setor(df):
+    # % atual de cada setor contra a soma das metas dos seus ativos
+    grupos = df.groupby('setor').agg(valor=('total_atual', 'sum'), meta_pct=('meta_pct', 'sum'), ativos=('qtde', 'size'))
+    patr = grupos['valor'].sum()
+    grupos['atual_pct'] = grupos['valor'] / patr * 100 if patr > 0 else 0.0
+    grupos['gap_pct'] = grupos['meta_pct'] - grupos['atual_pct']
+    return grupos.sort_values('valor', ascending=False)
+
+# Montado uma vez: as carteiras prontas são fixas
+MEMBROS_ESTRATEGIAS = pd.DataFrame(
+    [(nome, t) for nome, pesos in CARTEIRAS_PRONTAS.items() for t in pesos],
+    columns=['estrategia', 'ticker'],
+)
+
+def alocacao_por_estrategia(df):
+    # Um ativo pode estar em mais de uma estratégia e conta em todas elas
+    patr = df['total_atual'].sum()
+    valores = df[['total_atual', 'meta_pct']].rename_axis('ticker').reset_index()
+    m = MEMBROS_ESTRATEGIAS.merge(valores, on='ticker', how='inner')
+    grupos = m.groupby('estrategia').agg(valor=('total_atual', 'sum'), meta_pct=('meta_pct', 'sum'), ativos=('ticker', 'size'))
+    grupos['atual_pct'] = grupos['valor'] / patr * 100 if patr > 0 else 0.0
+    grupos['gap_pct'] = grupos['meta_pct'] - grupos['atual_pct']
+    return grupos.sort_values('valor', ascending=False)
+
+
+# --- VÁRIAS CARTEIRAS DE UMA VEZ ---
+def analisar_lote(carteiras):
+    # carteiras: {nome: DataFrame}. Calcula tudo numa passada só sobre o
+    # DataFrame concatenado (índice carteira/ticker) e resume por carteira.
+    if not carteiras: return pd.DataFrame(), pd.DataFrame()
+    df = calcular_metricas(pd.concat(carteiras, names=['carteira', 'ticker']))
+    resumos = df.groupby(level='carteira').agg(
+        patrimonio=('total_atual', 'sum'), lucro_real=('lucro_real', 'sum'),
+        total_investido=('total_inv', 'sum'), divs=('divs', 'sum'), ativos=('qtde', 'size'))
+    resumos['lucro_pct'] = _pct(resumos['lucro_real'], resumos['patrimonio'])
+    resumos['rentab_pct'] = _pct(resumos['lucro_real'], resumos['total_investido'])
+    resumos['yoc_pct'] = _pct(resumos['divs'], resumos['total_investido'])
+    resumos['projecao_anual'] = resumos['patrimonio'] * PROJECAO_ANUAL
+    return df, resumos
@@ -1,190 +1,366 @@
+import time
+T0_SCRIPT = time.perf_counter()
 import streamlit as st
 import pandas as pd
-import requests
-import json
-import time
-import plotly.graph_objects as go # Gráfico manual (robusto)
-import plotly.express as px
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import os
+import atexit
+import cotacoes
+import armazenamento
+from carteira import Carteira, CAMPOS, TODAS, PERSONALIZADOS
+from cotacoes import cache_cotacoes, agendador_cotacoes
+from alocacao import calcular_compras
+from constantes import CARTEIRAS_PRONTAS, CONFIG_PADRAO
+import analise
+import simulador
+import historico
+import proventos
+import backtest
+from desempenho import rastreador
+rastreador.marcar_partida("importacoes", time.perf_counter() - T0_SCRIPT)
 
 # --- CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(page_title="Robô Investidor Pro 10.0", layout="wide", page_icon="🎯")
 
-# --- CONSTANTES ---
-NOME_PLANILHA_GOOGLE = "carteira_robo_db"
-
-# --- MAPEAMENTO DE SETORES ---
-SETORES = {
-    "WEGE3": "Indústria", "VALE3": "Mineração", "PSSA3": "Seguros",
-    "ITUB4": "Bancos", "ITSA4": "Bancos", "BBAS3": "Bancos",
-    "TAEE11": "Elétrica", "CPLE6": "Elétrica", "EGIE3": "Elétrica",
-    "IVVB11": "Dólar/Exterior", "BTLG11": "FII Logística",
-    "HGLG11": "FII Logística", "KNCR11": "FII Papel",
-    "MXRF11": "FII Híbrido", "XPML11": "FII Shopping",
-    "PETR4": "Petróleo", "CURY3": "Construção", "CXSE3": "Seguros",
-    "DIRR3": "Construção", "POMO4": "Indústria", "RECV3": "Petróleo"
-}
-
-# --- ESTRATÉGIAS ---
-CARTEIRAS_PRONTAS = {
-    "🏆 Carteira Recomendada IA": {
-        "WEGE3": 10, "ITUB4": 15, "VALE3": 10, "TAEE11": 10, "PSSA3": 5, 
-        "IVVB11": 20, "HGLG11": 10, "KNCR11": 10, "MXRF11": 10
-    },
-    "Carteira Dividendos (Rico)": {
-        "CURY3": 10, "CXSE3": 10, "DIRR3": 10, "ITSA4": 10, 
-        "ITUB4": 10, "PETR4": 10, "POMO4": 10, "RECV3": 10, "VALE3": 10
-    },
-    "Carteira FIIs (Rico)": {
-        "XPML11": 10, "RBRR11": 10, "RBRX11": 9, "XPCI11": 9,
-        "BTLG11": 6, "LVBI11": 6, "PCIP11": 6, "PVBI11": 6,
-        "KNCR11": 5, "BRCO11": 5, "XPLG11": 4, "KNSC11": 1
-    }
-}
-
 # --- CONEXÃO COM GOOGLE SHEETS ---
-def conectar_google_sheets():
-    try:
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        creds_dict = dict(st.secrets["gcp_service_account"])
-        creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-        client = gspread.authorize(creds)
-        sh = client.open(NOME_PLANILHA_GOOGLE)
-        return sh
-    except Exception as e:
-        st.error(f"Erro ao conectar no Google: {e}")
-        return None
-
-# --- GERENCIAMENTO DE ABAS ---
-def pegar_aba_carteira(sh):
-    try: return sh.get_worksheet(0)
-    except: return sh.add_worksheet(title="Carteira", rows=100, cols=10)
-
-def pegar_aba_config(sh):
-    try: return sh.worksheet("Config")
-    except: 
-        ws = sh.add_worksheet(title="Config", rows=5, cols=5)
-        ws.update([["Senha", "MetaMensal"], ["123456", 1000.0]])
-        return ws
+def tem_google():
+    try: return "gcp_service_account" in st.secrets
+    except Exception: return False
+
+# Um único cliente por processo: autoriza uma vez e reaproveita planilha/abas
+@st.cache_resource(show_spinner=False)
+def pegar_conexao_sheets():
+    import planilha  # gspread/oauth2client só carregam quando o Google é usado
+    return planilha.ConexaoSheets(st.secrets["gcp_service_account"], chave=st.secrets.get("planilha_chave"))
+
+# --- ARMAZENAMENTO ---
+# O banco local (SQLite) é o caminho de leitura/escrita; a planilha do Google
+# vira uma réplica reconciliada em segundo plano (sem Google, roda offline).
+@st.cache_resource(show_spinner=False)
+def pegar_armazenamento():
+    return armazenamento.ArmazenamentoLocal()
+
+@st.cache_resource(show_spinner=False)
+def pegar_historico():
+    return historico.HistoricoPrecos()
+
+@st.cache_resource(show_spinner=False)
+def pegar_proventos():
+    return proventos.LivroProventos()
+
+@st.cache_resource(show_spinner=False)
+def pegar_sincronizador():
+    if not tem_google(): return None
+    sinc = armazenamento.SincronizadorSheets(pegar_armazenamento(), armazenamento.ArmazenamentoSheets(pegar_conexao_sheets()))
+    sinc.iniciar()
+    atexit.register(sinc.tentar_sincronizar)
+    return sinc
+
+def sincronizar_agora():
+    sinc = pegar_sincronizador()
+    if sinc and not sinc.tentar_sincronizar():
+        if sinc.ultimo_erro: st.error(f"Erro ao sincronizar com o Google: {sinc.ultimo_erro}")
+
+def garantir_primeira_sincronia():
+    # Só o primeiro uso (banco local vazio) espera pela planilha
+    if not pegar_armazenamento().ja_sincronizado(): sincronizar_agora()
 
 # --- CARREGAR/SALVAR ---
 def carregar_carteira():
-    sh = conectar_google_sheets()
-    if sh:
-        try:
-            ws = pegar_aba_carteira(sh)
-            dados = ws.get_all_records()
-            carteira = {}
-            for linha in dados:
-                t = linha['Ticker']
-                if not t: continue
-                
-                # Tratamento robusto para valores vazios
-                qtde = linha.get('Qtd', 0); qtde = 0 if qtde == '' else int(qtde)
-                meta = linha.get('Meta', 0); meta = 0 if meta == '' else int(meta)
-                
-                try: pm = float(str(linha.get('PM', 0)).replace(',', '.'))
-                except: pm = 0.0
-                
-                try: divs = float(str(linha.get('Divs', 0)).replace(',', '.'))
-                except: divs = 0.0
-                
-                # NOVO CAMPO: TETO (SNIPER)
-                try: teto = float(str(linha.get('Teto', 0)).replace(',', '.'))
-                except: teto = 0.0
-                
-                carteira[t] = {'qtde': qtde, 'meta_pct': meta, 'pm': pm, 'divs': divs, 'teto': teto}
-            return carteira
-        except: return {}
-    return {}
+    with rastreador.etapa("carregar_carteira"):
+        garantir_primeira_sincronia()
+        carteira = Carteira.de_dict(pegar_armazenamento().carregar_carteira())
+    # Foto das posições + ingestão de proventos novos, sem segurar a tela
+    livro = pegar_proventos()
+    livro.registrar_posicoes(carteira.qtdes())
+    livro.agendar(pegar_historico(), list(carteira))
+    return carteira
 
 def salvar_carteira(carteira):
-    sh = conectar_google_sheets()
-    if sh:
-        ws = pegar_aba_carteira(sh)
-        # Atualizando cabeçalho com TETO
-        linhas = [["Ticker", "Qtd", "Meta", "PM", "Divs", "Teto"]]
-        for t, dados in carteira.items():
-            linhas.append([
-                t, 
-                dados['qtde'], 
-                dados['meta_pct'], 
-                dados.get('pm', 0.0), 
-                dados.get('divs', 0.0),
-                dados.get('teto', 0.0)
-            ])
-        ws.clear()
-        ws.update(linhas)
+    pegar_armazenamento().salvar_carteira(carteira.para_dict())
+    pegar_proventos().registrar_posicoes(carteira.qtdes())
+    sinc = pegar_sincronizador()
+    if sinc: sinc.avisar()
 
 def carregar_config():
-    padrao = {"senha": "123456", "meta_mensal": 1000.00}
-    sh = conectar_google_sheets()
-    if sh:
-        try:
-            ws = pegar_aba_config(sh)
-            dados = ws.get_all_records()
-            if dados:
-                return {
-                    "senha": str(dados[0].get('Senha', '123456')),
-                    "meta_mensal": float(str(dados[0].get('MetaMensal', 1000)).replace(',', '.'))
-                }
-        except: pass
-    return padrao
+    garantir_primeira_sincronia()
+    return pegar_armazenamento().carregar_config() or dict(CONFIG_PADRAO)
+
+def config_login():
+    # Login sem Google: lê o banco local. Só no 1º uso (banco vazio) a
+    # reconciliação com a planilha começa em segundo plano enquanto o formulário aparece.
+    local = pegar_armazenamento()
+    conf = local.carregar_config()
+    if conf is not None: return conf
+    if not tem_google() or local.ja_sincronizado(): return dict(CONFIG_PADRAO)
+    pegar_sincronizador()
+    return None
+
+def aguardar_config():
+    # Chamado só ao enviar a senha no 1º uso, se a planilha ainda não respondeu
+    sinc = pegar_sincronizador()
+    with st.spinner("Buscando configuração na nuvem..."): sinc.aguardar_primeira(timeout=30)
+    if sinc.ultimo_erro: st.error(f"Erro ao sincronizar com o Google: {sinc.ultimo_erro}")
+    return pegar_armazenamento().carregar_config() or dict(CONFIG_PADRAO)
 
 def salvar_config(conf):
-    sh = conectar_google_sheets()
-    if sh:
-        ws = pegar_aba_config(sh)
-        ws.clear()
-        ws.update([["Senha", "MetaMensal"], [conf['senha'], conf['meta_mensal']]])
-
-# --- COTAÇÃO ---
-def obter_preco_atual(ticker):
-    if not ticker.endswith(".SA"): ticker = f"{ticker}.SA"
-    url = f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}?interval=1d&range=1d"
-    headers = {'User-Agent': 'Mozilla/5.0'}
-    try:
-        r = requests.get(url, headers=headers, timeout=3)
-        if r.status_code == 200:
-            return float(r.json()['chart']['result'][0]['meta']['regularMarketPrice'])
-    except: return 0.0
-    return 0.0
-
-def obter_setor(ticker):
-    return SETORES.get(ticker.replace(".SA","").strip(), "Outros")
-
-def obter_link_investidor10(ticker):
-    tipo = "fundos-imobiliarios" if "11" in ticker else "acoes"
-    return f"https://investidor10.com.br/{tipo}/{ticker.lower()}/"
-
-# --- CÁLCULO ---
-def calcular_compras(df, aporte):
-    caixa = aporte
-    df = df.copy()
-    df['comprar_qtd'] = 0
-    df['custo_total'] = 0.0
-    if df['meta_pct'].sum() == 0: return df, caixa
-    while caixa > 0:
-        patr_sim = (df['qtde']*df['preco_atual']).sum() + (df['comprar_qtd']*df['preco_atual']).sum() + caixa
-        if patr_sim == 0: break
-        df['pct_sim'] = ((df['qtde']+df['comprar_qtd'])*df['preco_atual']/patr_sim)*100
-        df['gap'] = df['meta_pct'] - df['pct_sim']
-        cand = df[(df['preco_atual'] <= caixa) & (df['gap'] > 0)]
-        if cand.empty: break
-        melhor = cand['gap'].idxmax()
-        preco = df.loc[melhor, 'preco_atual']
-        df.loc[melhor, 'comprar_qtd'] += 1
-        df.loc[melhor, 'custo_total'] += preco
-        caixa -= preco
-    return df, caixa
+    pegar_armazenamento().salvar_config(conf)
+    sinc = pegar_sincronizador()
+    if sinc: sinc.avisar()
+
+# --- EDITOR EM GRADE ---
+def grade_da_carteira(carteira_exibicao):
+    return carteira_exibicao[CAMPOS].reset_index()
+
+def aplicar_grade(carteira, visiveis, grade):
+    # Valida a grade inteira de uma vez e devolve ({ticker: campos}, removidos, erros).
+    # Tickers fora do filtro ficam intactos; os apagados da grade saem da carteira.
+    erros = []
+    grade = grade.copy()
+    grade['ticker'] = grade['ticker'].fillna('').astype(str).str.upper().str.strip().str.replace('.SA', '', regex=False)
+    if (grade['ticker'] == '').any(): erros.append("Há linha sem ticker.")
+    repetidos = grade.loc[grade['ticker'].duplicated() & (grade['ticker'] != ''), 'ticker']
+    if not repetidos.empty: erros.append("Ticker repetido: " + ", ".join(sorted(set(repetidos))))
+    ocultos = set(carteira) - set(visiveis)
+    conflito = sorted(set(grade['ticker']) & ocultos)
+    if conflito: erros.append("Já existe fora do filtro atual: " + ", ".join(conflito))
+    numeros = grade[CAMPOS].apply(pd.to_numeric, errors='coerce').fillna(0)
+    negativos = grade.loc[(numeros < 0).any(axis=1), 'ticker']
+    if not negativos.empty: erros.append("Valores negativos em: " + ", ".join(negativos))
+    if erros: return {}, [], erros
+
+    numeros[['qtde', 'meta_pct']] = numeros[['qtde', 'meta_pct']].round().astype(int)
+    editados = {t: dict(zip(CAMPOS, (int(q), int(m), float(p), float(d), float(te))))
+                for t, q, m, p, d, te in zip(grade['ticker'], *(numeros[c] for c in CAMPOS))}
+    removidos = [t for t in visiveis if t not in editados]
+    return editados, removidos, []
+
+# --- ANÁLISE ---
+def analisar_carteira(carteira_exibicao, aporte, max_idade=None):
+    # Reaproveita a análise anterior da sessão: se só as cotações mudaram,
+    # recalcula as métricas apenas dos tickers cujo preço se moveu.
+    tickers = list(carteira_exibicao.index)
+    # Divs = digitados à mão + recebidos pelo livro de proventos
+    with rastreador.etapa("proventos"): recebidos = pegar_proventos().recebidos().reindex(tickers, fill_value=0.0)
+    if recebidos.any(): carteira_exibicao = carteira_exibicao.assign(divs=carteira_exibicao['divs'] + recebidos)
+    with rastreador.etapa("cotacoes"): cotas, erros = cache_cotacoes.obter(tickers, max_idade=max_idade)
+    precos = pd.Series({t: c[0] for t, c in cotas.items()}, dtype=float).reindex(tickers)
+    assinatura = (tuple(pd.util.hash_pandas_object(carteira_exibicao)), aporte)
+    ant = st.session_state.get('analise_cache')
+    df_fim = sobra = None
+    with rastreador.etapa("metricas"):
+        if ant is not None and ant['assinatura'] == assinatura:
+            base = ant['base']
+            iguais = (base['preco_atual'] == precos) | (base['preco_atual'].isna() & precos.isna())
+            mudaram = base.index[~iguais]
+            if len(mudaram) == 0: df_fim, sobra = ant['df_fim'], ant['sobra']
+            else:
+                base = base.copy()
+                base.loc[mudaram, 'preco_atual'] = precos[mudaram]
+                base.loc[mudaram] = analise.calcular_metricas(base.loc[mudaram])
+        else:
+            base = carteira_exibicao.copy()
+            base['preco_atual'] = precos
+            base = analise.calcular_metricas(base)
+    # A alocação depende do patrimônio total: refaz sempre que algum preço mudou
+    if df_fim is None:
+        with rastreador.etapa("calcular_compras"): df_fim, sobra = calcular_compras(base[base['preco_atual'] > 0], aporte)
+    df_fim['idade_cotacao'] = df_fim.index.map({t: time.time() - c[1] for t, c in cotas.items()})
+    st.session_state['analise_cache'] = {'assinatura': assinatura, 'base': base, 'df_fim': df_fim, 'sobra': sobra}
+    return df_fim, sobra, erros
+
+# --- PAINEL (KPIs, ALERTAS, ORDEM DE COMPRA, DETALHES) ---
+def painel_analise(carteira_exibicao, aporte, max_idade=None):
+    with st.spinner("Varrendo o Mercado..."):
+        df_fim, sobra, erros_cotacao = analisar_carteira(carteira_exibicao, aporte, max_idade)
+    with rastreador.etapa("render"): desenhar_painel(df_fim, sobra, erros_cotacao, aporte)
+
+def painel_live(id_sessao, carteira_exibicao, aporte, intervalo):
+    # Só o fragmento roda numa página Live parada: renova a inscrição a cada
+    # ciclo, senão o agendador a descarta e a tela volta a buscar no Yahoo
+    agendador_cotacoes.acompanhar(id_sessao, carteira_exibicao.index, intervalo)
+    max_idade = max(cache_cotacoes.ttl, intervalo)
+    # Cada ciclo do fragmento é uma rodada própria no arquivo de métricas
+    with rastreador.rodada("live", id_sessao): painel_analise(carteira_exibicao, aporte, max_idade)
+
+def desenhar_painel(df_fim, sobra, erros_cotacao, aporte):
+    if erros_cotacao:
+        st.warning("⚠️ Sem cotação para: " + ", ".join(f"{t} ({e})" for t, e in erros_cotacao.items()))
+    if df_fim.empty: return
+
+    # --- LÓGICA DO SNIPER (ALERTA DE PREÇO) ---
+    alvos = analise.oportunidades(df_fim)
+    oportunidades = [f"{t}: R$ {l['preco_atual']:.2f} (Abaixo de R$ {l['teto']:.2f})" for t, l in alvos.iterrows()]
+
+    if oportunidades:
+        st.toast(f"🚨 {len(oportunidades)} Oportunidades Detectadas!", icon="🔥")
+        st.warning(f"### 🔥 ALERTA DE COMPRA (PREÇO TETO ATINGIDO):\n" + "\n".join([f"- {op}" for op in oportunidades]))
+
+    res = analise.resumo(df_fim)
+    patr = res['patrimonio']
+
+    k1, k2, k3, k4 = st.columns(4)
+    k1.metric("Patrimônio", f"R$ {patr:,.2f}")
+    k2.metric("Lucro Real", f"R$ {res['lucro_real']:,.2f}", delta=f"{res['lucro_pct']:.1f}%")
+    k3.metric("🔮 Projeção Anual (8%)", f"R$ {res['projecao_anual']:,.2f}", delta="Estimado")
+    k4.metric("Caixa", f"R$ {sobra:,.2f}")
+
+    st.divider()
+
+    # --- LISTA DE COMPRAS ---
+    st.subheader("🛒 Ordem de Compra")
+    compra = df_fim[df_fim['comprar_qtd']>0].sort_values('custo_total', ascending=False)
+    if not compra.empty:
+        st.dataframe(compra[['preco_atual','meta_pct','comprar_qtd','custo_total']].style.format({'preco_atual':'R$ {:.2f}','custo_total':'R$ {:.2f}','meta_pct':'{:.0f}%'}), use_container_width=True)
+    else: st.success("Aguarde! Nenhuma compra necessária.")
+
+    st.divider()
+    st.subheader("🔎 Detalhes Interativos (com Alertas)")
+
+    cols = ['link_analise', 'qtde','pm','preco_atual', 'teto', 'divs','lucro_real','rentab_pct', 'yoc_pct', 'idade_cotacao']
+    df_show = df_fim[cols].sort_values('rentab_pct', ascending=False)
+
+    st.dataframe(
+        df_show,
+        column_config={
+            "link_analise": st.column_config.LinkColumn("Analisar", display_text="Ver no Inv10"),
+            "pm": st.column_config.NumberColumn("PM", format="R$ %.2f"),
+            "preco_atual": st.column_config.NumberColumn("Preço", format="R$ %.2f"),
+            "teto": st.column_config.NumberColumn("🎯 Teto", format="R$ %.2f"), # NOVO
+            "divs": st.column_config.NumberColumn("Divs", format="R$ %.2f"),
+            "lucro_real": st.column_config.NumberColumn("Lucro", format="R$ %.2f"),
+            "rentab_pct": st.column_config.NumberColumn("% Ret", format="%.1f%%"),
+            "yoc_pct": st.column_config.NumberColumn("% YoC", format="%.1f%%"),
+            "idade_cotacao": st.column_config.NumberColumn("⏱️ Cotação", format="há %d s"),
+        },
+        use_container_width=True,
+        hide_index=False
+    )
+
+    # --- ALOCAÇÃO POR SETOR ---
+    st.subheader("🧭 Alocação por Setor (Atual x Meta)")
+    st.dataframe(
+        analise.alocacao_por_setor(df_fim)[['valor', 'atual_pct', 'meta_pct', 'gap_pct']],
+        column_config={
+            "valor": st.column_config.NumberColumn("Valor", format="R$ %.2f"),
+            "atual_pct": st.column_config.NumberColumn("% Atual", format="%.1f%%"),
+            "meta_pct": st.column_config.NumberColumn("% Meta", format="%.0f%%"),
+            "gap_pct": st.column_config.NumberColumn("Gap", format="%.1f%%"),
+        },
+        use_container_width=True
+    )
+
+    # --- ALOCAÇÃO POR ESTRATÉGIA ---
+    por_estrategia = analise.alocacao_por_estrategia(df_fim)
+    if not por_estrategia.empty:
+        st.subheader("🧩 Alocação por Estratégia (Atual x Meta)")
+        st.dataframe(
+            por_estrategia[['ativos', 'valor', 'atual_pct', 'meta_pct', 'gap_pct']],
+            column_config={
+                "ativos": st.column_config.NumberColumn("Ativos"),
+                "valor": st.column_config.NumberColumn("Valor", format="R$ %.2f"),
+                "atual_pct": st.column_config.NumberColumn("% Atual", format="%.1f%%"),
+                "meta_pct": st.column_config.NumberColumn("% Meta", format="%.0f%%"),
+                "gap_pct": st.column_config.NumberColumn("Gap", format="%.1f%%"),
+            },
+            use_container_width=True
+        )
+
+    # --- HISTÓRICO (ARMAZÉM LOCAL, SEM REDE) ---
+    with st.expander("📈 Histórico de Preços", expanded=False):
+        escolhidos = st.multiselect("Ativos", list(df_fim.index), default=list(df_fim.index[:5]))
+        precos_hist = pegar_historico().matriz(escolhidos, "Adj Close")
+        if precos_hist.empty: st.info("Sem histórico local. Atualize em ⚙️ Configurações.")
+        else: st.line_chart(precos_hist.ffill().div(precos_hist.bfill().iloc[0]).mul(100))
+
+    # --- SIMULADOR BOLA DE NEVE (BLINDADO) ---
+    st.divider()
+    with st.expander("🔮 Simulador Bola de Neve (O Futuro)", expanded=False):
+        st.caption("Veja o poder dos juros compostos com seu aporte mensal atual.")
+        col_sim1, col_sim2, col_sim3 = st.columns(3)
+        anos = col_sim1.slider("Anos investindo", 1, 30, 10)
+        taxa_anual = col_sim2.number_input("Taxa Anual Média (%)", value=10.0, step=0.5)
+        aporte_sim = col_sim3.number_input("Aporte Mensal (R$)", value=float(aporte), step=100.0)
+        col_mc1, col_mc2 = st.columns([1, 2])
+        usar_mc = col_mc1.toggle("🎲 Monte Carlo (P10/P50/P90)")
+        vol_anual = col_mc2.number_input("Volatilidade Anual (%)", value=15.0, min_value=0.0, step=1.0, disabled=not usar_mc)
+        usar_hist = col_mc1.toggle("📈 Retornos históricos da carteira", disabled=not usar_mc)
+        retornos_hist = None
+        if usar_mc and usar_hist:
+            # Pesos atuais (ou metas, se a carteira ainda está vazia) sobre o histórico local
+            pesos = df_fim['total_atual'] if df_fim['total_atual'].sum() > 0 else df_fim['meta_pct']
+            serie = pegar_historico().retornos_mensais(pesos.to_dict())
+            if serie.empty: st.info("Sem histórico local suficiente; usando a volatilidade informada.")
+            else: retornos_hist = tuple(serie.round(6))
+
+        # Memoizado pelos parâmetros: voltar a um valor já visto é instantâneo
+        patr_sim = round(float(patr), 2)
+        if usar_mc: df_ev = simulador.simular_monte_carlo(patr_sim, float(aporte_sim), float(taxa_anual), float(vol_anual), int(anos), retornos_mensais=retornos_hist)
+        else: df_ev = simulador.simular_deterministico(patr_sim, float(aporte_sim), float(taxa_anual), int(anos))
+        total = df_ev['Total Acumulado'].iloc[-1]
+        total_investido = df_ev['Total Investido'].iloc[-1]
+
+        st.metric(f"Patrimônio em {anos} anos", f"R$ {total:,.2f}", delta=f"Lucro de R$ {total - total_investido:,.2f}")
+        if usar_mc:
+            st.caption(f"Em 80% dos {simulador.CAMINHOS_PADRAO:,} cenários: entre R$ {df_ev['P10'].iloc[-1]:,.2f} e R$ {df_ev['P90'].iloc[-1]:,.2f} (mediana R$ {df_ev['P50'].iloc[-1]:,.2f}).")
+
+        try:
+            import plotly.graph_objects as go  # só carrega quando o simulador desenha
+            fig_ev = go.Figure()
+            fig_ev.add_trace(go.Scatter(x=df_ev['Ano'], y=df_ev['Total Investido'], fill='tozeroy', mode='lines', name='Saiu do Bolso', line=dict(color='#808080')))
+            if usar_mc:
+                fig_ev.add_trace(go.Scatter(x=df_ev['Ano'], y=df_ev['P10'], mode='lines', name='P10', line=dict(color='#00cc96', width=0), showlegend=False))
+                fig_ev.add_trace(go.Scatter(x=df_ev['Ano'], y=df_ev['P90'], fill='tonexty', mode='lines', name='P10–P90', line=dict(color='#00cc96', width=0), fillcolor='rgba(0,204,150,0.2)'))
+                fig_ev.add_trace(go.Scatter(x=df_ev['Ano'], y=df_ev['P50'], mode='lines', name='Mediana (P50)', line=dict(color='#00cc96', dash='dash')))
+                fig_ev.add_trace(go.Scatter(x=df_ev['Ano'], y=df_ev['Total Acumulado'], mode='lines', name='Com Juros (fixo)', line=dict(color='#636efa')))
+            else:
+                fig_ev.add_trace(go.Scatter(x=df_ev['Ano'], y=df_ev['Total Acumulado'], fill='tonexty', mode='lines', name='Com Juros', line=dict(color='#00cc96')))
+            fig_ev.update_layout(title="Curva Exponencial de Riqueza", xaxis_title="Anos", yaxis_title="Patrimônio (R$)")
+            st.plotly_chart(fig_ev, use_container_width=True)
+        except Exception as e:
+            st.warning("Erro visual no gráfico (não afeta os cálculos).")
+            st.dataframe(df_ev)
+
+# --- DESEMPENHO ---
+def alternar_rastreio():
+    # O rastreador é do processo: ligar aqui mede todas as sessões
+    rastreador.ativo = st.session_state['rastreio']
+    if not rastreador.ativo: rastreador.zerar()
+
+def painel_desempenho():
+    with st.expander("⏱️ Desempenho", expanded=False):
+        st.toggle("Medir etapas", value=rastreador.ativo, key='rastreio', on_change=alternar_rastreio)
+        if rastreador.partida: st.caption("Partida a frio: " + " · ".join(f"{k} {v * 1000:,.0f} ms" for k, v in rastreador.partida.items()))
+        # Contadores do processo, medidos mesmo com o rastreio desligado
+        segundo_plano = [f"Live: {agendador_cotacoes.rodadas} rodadas"]
+        sinc = pegar_sincronizador()
+        if sinc:
+            conexao, escrita = sinc.remoto.conexao, sinc.remoto.escrita
+            segundo_plano.append(f"Sheets: {conexao.autorizacoes} autorizações, {escrita.gravacoes} gravações ({escrita.celulas_gravadas} células)")
+            if sinc.ultima_sincronia: segundo_plano.append("última sincronia " + time.strftime("%H:%M:%S", time.localtime(sinc.ultima_sincronia)))
+        st.caption(" · ".join(segundo_plano))
+        if not rastreador.ativo: return
+        rodada = rastreador.ultima_rodada
+        if rodada:
+            st.caption(f"Última rodada ({rodada['tipo']}): {rodada['total_s'] * 1000:,.0f} ms")
+            st.dataframe(pd.Series(rodada['etapas'], dtype=float).mul(1000).sort_values(ascending=False).rename("ms"), use_container_width=True)
+        etapas = rastreador.etapas()
+        if etapas:
+            st.dataframe(
+                pd.DataFrame(etapas).set_index('etapa')[['n', 'mediana_ms', 'p95_ms', 'max_ms']],
+                column_config={c: st.column_config.NumberColumn(c.replace('_ms', ''), format="%.1f ms") for c in ['mediana_ms', 'p95_ms', 'max_ms']},
+                use_container_width=True
+            )
+        contadores = rastreador.contadores()
+        if contadores: st.caption(" · ".join(f"{k}: {v}" for k, v in sorted(contadores.items())))
+        lentas = rastreador.cotacoes_lentas(5)
+        if lentas: st.caption("Cotações mais lentas: " + ", ".join(f"{c['ticker']} {c['ultima'] * 1000:.0f} ms" for c in lentas))
+        if rastreador.arquivo: st.caption(f"Métricas em `{rastreador.arquivo}`")
 
 # --- LOGIN ---
 def check_password():
-    if 'config_cache' not in st.session_state: st.session_state['config_cache'] = carregar_config()
-    conf = st.session_state['config_cache']
+    if 'config_cache' not in st.session_state:
+        conf = config_login()
+        if conf is not None: st.session_state['config_cache'] = conf
 
     if 'logado' not in st.session_state: st.session_state['logado'] = False
     if st.session_state['logado']: return True
@@ -193,25 +369,40 @@ def check_password():
     with col2:
         st.markdown("## 🔐 Acesso Sniper (Cloud)")
         senha = st.text_input("Digite sua senha:", type="password")
-        if st.button("Entrar", type="primary"):
+        entrar = st.button("Entrar", type="primary")
+        rastreador.marcar_partida("login", time.perf_counter() - T0_SCRIPT)
+        if entrar:
+            if 'config_cache' not in st.session_state: st.session_state['config_cache'] = aguardar_config()
+            conf = st.session_state['config_cache']
             if senha == conf['senha']:
                 st.session_state['logado'] = True; st.rerun()
             else: st.error("Senha incorreta!")
     return False
 
 # ================= APP START =================
+if 'id_sessao' not in st.session_state: st.session_state['id_sessao'] = os.urandom(8).hex()
+rastreador.iniciar_rodada()
 if check_password():
     if 'config_cache' not in st.session_state: st.session_state['config_cache'] = carregar_config()
     conf = st.session_state['config_cache']
     
     with st.sidebar:
         st.title("🎯 Painel Sniper")
-        menu = st.radio("Navegação", ["🏠 Minha Carteira", "⚙️ Configurações"])
+        menu = st.radio("Navegação", ["🏠 Minha Carteira", "📊 Backtest", "⚙️ Configurações"])
         st.divider()
-        st.success("Google Drive: Conectado ✅")
-        if st.button("🔒 Sair"): st.session_state['logado']=False; st.rerun()
+        sinc = pegar_sincronizador()
+        if not sinc: st.info("Modo offline (banco local) 💾")
+        elif sinc.ultimo_erro: st.warning("⚠️ Google Drive: falha na sincronia; tentando de novo.")
+        else: st.success("Google Drive: Conectado ✅")
+        if sinc and sinc.conflitos: st.warning("⚠️ Conflito com a planilha (mantida a versão local): " + ", ".join(sinc.conflitos))
+        if st.button("🔒 Sair"): sincronizar_agora(); st.session_state['logado']=False; st.rerun()
         st.divider()
-        modo_live = st.toggle("🔄 Modo Live (60s)")
+        modo_live = st.toggle("🔄 Modo Live")
+        if modo_live:
+            intervalo_live = st.number_input("Atualizar a cada (s)", min_value=10, max_value=600, value=int(cotacoes.INTERVALO_LIVE), step=10)
+        else: agendador_cotacoes.cancelar(st.session_state['id_sessao'])
+        est_cache = cache_cotacoes.estatisticas()
+        st.caption(f"Cache de cotações: {est_cache['acertos'] + est_cache['compartilhadas']} acertos / {est_cache['falhas']} buscas")
 
     if 'carteira_cache' not in st.session_state:
         with st.spinner("Calibrando Mira do Sniper..."):
@@ -222,27 +413,13 @@ if check_password():
     if menu == "🏠 Minha Carteira":
         st.title("Minha Carteira (Nuvem ☁️)")
 
-        if not carteira_completa: st.warning("Carteira vazia no Google Sheets.")
+        if not len(carteira_completa): st.warning("Carteira vazia.")
 
         # --- FILTROS ---
         st.markdown("### 🔍 Visualização")
-        opcoes_filtro = ["Todas"] + list(CARTEIRAS_PRONTAS.keys()) + ["Personalizados"]
-        filtro_selecionado = st.multiselect("Filtrar Carteiras:", opcoes_filtro, default=["Todas"])
-        
-        carteira_exibicao = {}
-        if "Todas" in filtro_selecionado or not filtro_selecionado:
-            carteira_exibicao = carteira_completa.copy()
-        else:
-            tickers_permitidos = []
-            todos_prontos = []
-            for k, v in CARTEIRAS_PRONTAS.items(): todos_prontos.extend(v.keys())
-            for selecao in filtro_selecionado:
-                if selecao in CARTEIRAS_PRONTAS: tickers_permitidos.extend(CARTEIRAS_PRONTAS[selecao].keys())
-                elif selecao == "Personalizados":
-                    for t in carteira_completa.keys():
-                        if t not in todos_prontos: tickers_permitidos.append(t)
-            for t, dados in carteira_completa.items():
-                if t in tickers_permitidos: carteira_exibicao[t] = dados
+        opcoes_filtro = [TODAS] + list(CARTEIRAS_PRONTAS.keys()) + [PERSONALIZADOS]
+        filtro_selecionado = st.multiselect("Filtrar Carteiras:", opcoes_filtro, default=[TODAS])
+        carteira_exibicao = carteira_completa.visao(carteira_completa.filtrar(filtro_selecionado))
 
         st.divider()
 
@@ -257,166 +434,86 @@ if check_password():
             add = st.text_input("Novo Ticker (ex: BBAS3)")
             if st.button("Adicionar") and add:
                 t = add.upper().strip().replace(".SA","")
-                if t not in carteira_completa: 
-                    carteira_completa[t]={'qtde':0,'meta_pct':10,'pm':0.0,'divs':0.0, 'teto':0.0}
-                    salvar_carteira(carteira_completa) 
-                    st.session_state['carteira_cache'] = carteira_completa
+                if carteira_completa.adicionar(t, meta_pct=10):
+                    salvar_carteira(carteira_completa)
                     st.rerun()
 
             st.divider()
-            mudou_algo = False
-            remover_lista = []
-            
-            # CABEÇALHO DO EDITOR
-            cols_head = st.columns([1, 0.8, 0.8, 1, 1, 1, 0.5])
-            cols_head[0].markdown("**Ativo**")
-            cols_head[1].markdown("**Qtd**")
-            cols_head[2].markdown("**Meta%**")
-            cols_head[3].markdown("**PM**")
-            cols_head[4].markdown("**Divs**")
-            cols_head[5].markdown("**🎯 Teto (Alert)**") # NOVO
-            
-            for t in list(carteira_exibicao.keys()):
-                cols = st.columns([1, 0.8, 0.8, 1, 1, 1, 0.5])
-                cols[0].write(f"**{t}**")
-                
-                nq = cols[1].number_input(f"Q_{t}", value=int(carteira_completa[t]['qtde']), min_value=0, step=1, key=f"q_{t}", label_visibility="collapsed")
-                nm = cols[2].number_input(f"M_{t}", value=int(carteira_completa[t]['meta_pct']), min_value=0, step=1, key=f"m_{t}", label_visibility="collapsed")
-                np = cols[3].number_input(f"P_{t}", value=float(carteira_completa[t].get('pm',0)), min_value=0.0, step=0.01, format="%.2f", key=f"p_{t}", label_visibility="collapsed")
-                nd = cols[4].number_input(f"D_{t}", value=float(carteira_completa[t].get('divs',0)), min_value=0.0, step=0.01, format="%.2f", key=f"d_{t}", label_visibility="collapsed")
-                # NOVO CAMPO TETO
-                nt = cols[5].number_input(f"T_{t}", value=float(carteira_completa[t].get('teto',0)), min_value=0.0, step=0.01, format="%.2f", key=f"t_{t}", label_visibility="collapsed", help="Se o preço cair abaixo disso, o robô avisa!")
-
-                if cols[6].button("🗑️", key=f"del_{t}"): remover_lista.append(t); mudou_algo=True
-                
-                # Atualização
-                if (nq!=carteira_completa[t]['qtde'] or nm!=carteira_completa[t]['meta_pct'] or 
-                    np!=carteira_completa[t].get('pm',0) or nd!=carteira_completa[t].get('divs',0) or 
-                    nt!=carteira_completa[t].get('teto',0)):
-                    
-                    carteira_completa[t].update({'qtde':nq, 'meta_pct':nm, 'pm':np, 'divs':nd, 'teto':nt})
-                    mudou_algo=True
-            
-            if remover_lista:
-                for t in remover_lista: del carteira_completa[t]
-                salvar_carteira(carteira_completa); st.session_state['carteira_cache'] = carteira_completa; st.rerun()
-            if mudou_algo: 
-                salvar_carteira(carteira_completa); st.session_state['carteira_cache'] = carteira_completa
+            # Uma grade só (virtualizada); as edições ficam no navegador até o "Salvar"
+            grade = grade_da_carteira(carteira_exibicao)
+            with st.form("form_grade"):
+                editada = st.data_editor(
+                    grade,
+                    column_config={
+                        "ticker": st.column_config.TextColumn("Ativo", required=True, max_chars=12),
+                        "qtde": st.column_config.NumberColumn("Qtd", min_value=0, step=1, format="%d", default=0),
+                        "meta_pct": st.column_config.NumberColumn("Meta%", min_value=0, step=1, format="%d", default=0),
+                        "pm": st.column_config.NumberColumn("PM", min_value=0.0, step=0.01, format="R$ %.2f", default=0.0),
+                        "divs": st.column_config.NumberColumn("Divs", min_value=0.0, step=0.01, format="R$ %.2f", default=0.0),
+                        "teto": st.column_config.NumberColumn("🎯 Teto (Alert)", min_value=0.0, step=0.01, format="R$ %.2f", default=0.0, help="Se o preço cair abaixo disso, o robô avisa!"),
+                    },
+                    num_rows="dynamic", hide_index=True, use_container_width=True,
+                    **({} if len(grade) <= 15 else {"height": 560}),
+                    key=f"grade_{st.session_state.get('versao_grade', 0)}",
+                )
+                salvar_grade = st.form_submit_button("💾 Salvar alterações")
+            if salvar_grade:
+                editados, removidos, erros_grade = aplicar_grade(carteira_completa, list(carteira_exibicao.index), editada)
+                if erros_grade: st.error("Nada foi salvo:\n" + "\n".join(f"- {e}" for e in erros_grade))
+                elif mudancas := carteira_completa.aplicar(editados, removidos):
+                    salvar_carteira(carteira_completa)
+                    # Grade nova: as edições já salvas não são reaplicadas sobre a carteira atualizada
+                    st.session_state['versao_grade'] = st.session_state.get('versao_grade', 0) + 1
+                    st.toast(f"{mudancas} alteração(ões) salva(s)!")
+                    st.rerun()
 
         # --- DASHBOARD ---
         if executar or modo_live:
-            if carteira_exibicao:
-                with st.spinner("Varrendo o Mercado..."):
-                    df = pd.DataFrame.from_dict(carteira_exibicao, orient='index')
-                    precos = {}
-                    for t in df.index: precos[t] = obter_preco_atual(t)
-                    df['preco_atual'] = df.index.map(precos)
-                    df = df[df['preco_atual'] > 0]
-
-                    if not df.empty:
-                        # --- LÓGICA DO SNIPER (ALERTA DE PREÇO) ---
-                        oportunidades = []
-                        for t in df.index:
-                            preco = df.loc[t, 'preco_atual']
-                            teto = df.loc[t, 'teto']
-                            if teto > 0 and preco <= teto:
-                                oportunidades.append(f"{t}: R$ {preco:.2f} (Abaixo de R$ {teto:.2f})")
-                        
-                        if oportunidades:
-                            st.toast(f"🚨 {len(oportunidades)} Oportunidades Detectadas!", icon="🔥")
-                            st.warning(f"### 🔥 ALERTA DE COMPRA (PREÇO TETO ATINGIDO):\n" + "\n".join([f"- {op}" for op in oportunidades]))
-
-                        # --- CÁLCULOS NORMAIS ---
-                        df['total_atual'] = df['qtde'] * df['preco_atual']
-                        df['total_inv'] = df['qtde'] * df['pm']
-                        df['lucro_cota'] = df['total_atual'] - df['total_inv']
-                        df['lucro_real'] = df['lucro_cota'] + df['divs']
-                        df['rentab_pct'] = df.apply(lambda x: (x['lucro_real']/x['total_inv'])*100 if x['total_inv']>0 else 0, axis=1)
-                        df['yoc_pct'] = df.apply(lambda x: (x['divs']/x['total_inv'])*100 if x['total_inv']>0 else 0, axis=1)
-                        df['setor'] = df.index.map(obter_setor)
-                        df['link_analise'] = df.index.map(obter_link_investidor10)
-
-                        df_fim, sobra = calcular_compras(df, aporte)
-                        
-                        patr = df_fim['total_atual'].sum()
-                        lucro = df_fim['lucro_real'].sum()
-                        projecao_anual = patr * 0.08 
-                        
-                        k1, k2, k3, k4 = st.columns(4)
-                        k1.metric("Patrimônio", f"R$ {patr:,.2f}")
-                        k2.metric("Lucro Real", f"R$ {lucro:,.2f}", delta=f"{(lucro/patr*100) if patr>0 else 0:.1f}%")
-                        k3.metric("🔮 Projeção Anual (8%)", f"R$ {projecao_anual:,.2f}", delta="Estimado")
-                        k4.metric("Caixa", f"R$ {sobra:,.2f}")
-
-                        st.divider()
-
-                        # --- LISTA DE COMPRAS ---
-                        st.subheader("🛒 Ordem de Compra")
-                        compra = df_fim[df_fim['comprar_qtd']>0].sort_values('custo_total', ascending=False)
-                        if not compra.empty:
-                            st.dataframe(compra[['preco_atual','meta_pct','comprar_qtd','custo_total']].style.format({'preco_atual':'R$ {:.2f}','custo_total':'R$ {:.2f}','meta_pct':'{:.0f}%'}), use_container_width=True)
-                        else: st.success("Aguarde! Nenhuma compra necessária.")
-
-                        st.divider()
-                        st.subheader("🔎 Detalhes Interativos (com Alertas)")
-                        
-                        cols = ['link_analise', 'qtde','pm','preco_atual', 'teto', 'divs','lucro_real','rentab_pct', 'yoc_pct']
-                        df_show = df_fim[cols].sort_values('rentab_pct', ascending=False)
-                        
-                        st.dataframe(
-                            df_show,
-                            column_config={
-                                "link_analise": st.column_config.LinkColumn("Analisar", display_text="Ver no Inv10"),
-                                "pm": st.column_config.NumberColumn("PM", format="R$ %.2f"),
-                                "preco_atual": st.column_config.NumberColumn("Preço", format="R$ %.2f"),
-                                "teto": st.column_config.NumberColumn("🎯 Teto", format="R$ %.2f"), # NOVO
-                                "divs": st.column_config.NumberColumn("Divs", format="R$ %.2f"),
-                                "lucro_real": st.column_config.NumberColumn("Lucro", format="R$ %.2f"),
-                                "rentab_pct": st.column_config.NumberColumn("% Ret", format="%.1f%%"),
-                                "yoc_pct": st.column_config.NumberColumn("% YoC", format="%.1f%%"),
-                            },
-                            use_container_width=True,
-                            hide_index=False
-                        )
-
-                        # --- SIMULADOR BOLA DE NEVE (BLINDADO) ---
-                        st.divider()
-                        with st.expander("🔮 Simulador Bola de Neve (O Futuro)", expanded=False):
-                            st.caption("Veja o poder dos juros compostos com seu aporte mensal atual.")
-                            col_sim1, col_sim2, col_sim3 = st.columns(3)
-                            anos = col_sim1.slider("Anos investindo", 1, 30, 10)
-                            taxa_anual = col_sim2.number_input("Taxa Anual Média (%)", value=10.0, step=0.5)
-                            aporte_sim = col_sim3.number_input("Aporte Mensal (R$)", value=float(aporte), step=100.0)
-                            
-                            taxa_mensal = (1 + taxa_anual/100)**(1/12) - 1
-                            meses = anos * 12
-                            
-                            evolucao = []
-                            total = patr
-                            total_investido = patr
-                            
-                            for m in range(meses):
-                                total = total * (1 + taxa_mensal) + aporte_sim
-                                total_investido += aporte_sim
-                                if m % 12 == 0:
-                                    evolucao.append({"Ano": (m//12)+1, "Total Acumulado": total, "Total Investido": total_investido})
-                            
-                            evolucao.append({"Ano": anos, "Total Acumulado": total, "Total Investido": total_investido})
-                            df_ev = pd.DataFrame(evolucao)
-                            
-                            st.metric(f"Patrimônio em {anos} anos", f"R$ {total:,.2f}", delta=f"Lucro de R$ {total - total_investido:,.2f}")
-                            
-                            try:
-                                fig_ev = go.Figure()
-                                fig_ev.add_trace(go.Scatter(x=df_ev['Ano'], y=df_ev['Total Investido'], fill='tozeroy', mode='lines', name='Saiu do Bolso', line=dict(color='#808080')))
-                                fig_ev.add_trace(go.Scatter(x=df_ev['Ano'], y=df_ev['Total Acumulado'], fill='tonexty', mode='lines', name='Com Juros', line=dict(color='#00cc96')))
-                                fig_ev.update_layout(title="Curva Exponencial de Riqueza", xaxis_title="Anos", yaxis_title="Patrimônio (R$)")
-                                st.plotly_chart(fig_ev, use_container_width=True)
-                            except Exception as e:
-                                st.warning("Erro visual no gráfico (não afeta os cálculos).")
-                                st.dataframe(df_ev)
-
-            else: st.info("Filtro vazio.")
+            if carteira_exibicao.empty: st.info("Filtro vazio.")
+            elif modo_live:
+                # Só este bloco roda de novo a cada ciclo; o agendador mantém o cache quente
+                st.fragment(run_every=intervalo_live)(painel_live)(st.session_state['id_sessao'], carteira_exibicao, aporte, intervalo_live)
+            else: painel_analise(carteira_exibicao, aporte)
+
+    # ================= TELA: BACKTEST =================
+    elif menu == "📊 Backtest":
+        st.title("Backtest das Estratégias")
+        st.caption("Aporte mensal no 1º pregão de cada mês, comprando pela mesma regra de meta% da Ordem de Compra. Usa o histórico local.")
+        estrategias = st.multiselect("Estratégias:", list(CARTEIRAS_PRONTAS.keys()), default=list(CARTEIRAS_PRONTAS.keys()))
+        b1, b2, b3 = st.columns(3)
+        anos_bt = b1.slider("Anos", 1, 15, 10)
+        aportes_bt = b2.multiselect("Aportes Mensais (R$)", [500.0, 1000.0, 2000.0, 5000.0], default=[1000.0])
+        reinvestir_bt = b3.toggle("Reinvestir proventos", value=True)
+
+        if st.button("▶️ Rodar Backtest", type="primary") and estrategias and aportes_bt:
+            tickers_bt = sorted({t for e in estrategias for t in CARTEIRAS_PRONTAS[e]})
+            inicio_bt = (pd.Timestamp.today() - pd.DateOffset(years=anos_bt)).normalize()
+            precos_bt, proventos_bt = backtest.carregar_matrizes(pegar_historico(), tickers_bt, inicio_bt)
+            if precos_bt.empty: st.warning("Sem histórico local. Atualize em ⚙️ Configurações.")
+            else:
+                with st.spinner("Rodando cenários em paralelo..."):
+                    cenarios = backtest.cenarios_varredura({e: CARTEIRAS_PRONTAS[e] for e in estrategias}, aportes_bt, (reinvestir_bt,))
+                    resultados = backtest.rodar_backtests(precos_bt, proventos_bt, cenarios)
+                resultados = {k: v for k, v in resultados.items() if v}
+                st.subheader("Patrimônio")
+                st.line_chart(pd.DataFrame({k: v['curva']['patrimonio'] for k, v in resultados.items()}))
+                st.subheader("Drawdown da Cota")
+                st.area_chart(pd.DataFrame({k: v['curva']['drawdown'] * 100 for k, v in resultados.items()}))
+                st.dataframe(
+                    backtest.tabela_metricas(resultados),
+                    column_config={
+                        "patrimonio_final": st.column_config.NumberColumn("Patrimônio", format="R$ %.2f"),
+                        "total_investido": st.column_config.NumberColumn("Investido", format="R$ %.2f"),
+                        "lucro": st.column_config.NumberColumn("Lucro", format="R$ %.2f"),
+                        "retorno_cota_pct": st.column_config.NumberColumn("% Ret (cota)", format="%.1f%%"),
+                        "retorno_anual_pct": st.column_config.NumberColumn("% a.a.", format="%.1f%%"),
+                        "volatilidade_pct": st.column_config.NumberColumn("Vol a.a.", format="%.1f%%"),
+                        "max_drawdown_pct": st.column_config.NumberColumn("Max DD", format="%.1f%%"),
+                        "proventos_totais": st.column_config.NumberColumn("Proventos", format="R$ %.2f"),
+                        "yoc_12m_pct": st.column_config.NumberColumn("% YoC 12m", format="%.1f%%"),
+                    },
+                    use_container_width=True
+                )
 
     elif menu == "⚙️ Configurações":
         st.title("Configurações (Nuvem ☁️)")
@@ -440,20 +537,53 @@ if check_password():
                 salvar_config(conf)
                 st.session_state['config_cache'] = conf
                 st.success("Senha atualizada! Faça login novamente.")
+                sincronizar_agora()
                 time.sleep(2); st.session_state['logado']=False; st.rerun()
             else: st.error("Senhas diferentes ou muito curta.")
         
+        st.divider()
+        st.subheader("📈 Histórico de Preços")
+        st.caption("Guarda OHLCV e proventos localmente; cada atualização só baixa os pregões novos.")
+        if st.button("Atualizar Histórico"):
+            with st.spinner("Baixando pregões novos..."):
+                novas, erros_hist = pegar_historico().atualizar(historico.tickers_padrao(list(carteira_completa)))
+            st.success(f"{sum(novas.values())} barras novas em {len(novas)} ativos.")
+            if erros_hist: st.warning("Sem dados para: " + ", ".join(erros_hist))
+
+        st.divider()
+        st.subheader("💸 Proventos")
+        livro = pegar_proventos()
+        st.caption("Dividendos/JCP lançados pela quantidade que você tinha na data-com, a partir da primeira vez que a carteira foi salva aqui. A coluna Divs guarda os anteriores.")
+        if st.button("Atualizar Proventos"):
+            with st.spinner("Buscando proventos novos..."):
+                novos, erros_prov = livro.tentar_atualizar(pegar_historico(), list(carteira_completa))
+            if livro.ultimo_erro: st.error(f"Erro ao atualizar proventos: {livro.ultimo_erro}")
+            else: st.success(f"{sum(novos.values())} proventos novos em {len(novos)} ativos.")
+            if erros_prov: st.warning("Sem dados para: " + ", ".join(erros_prov))
+        eventos = livro.eventos()
+        if not eventos.empty:
+            st.dataframe(
+                eventos.head(50),
+                column_config={
+                    "data_ex": st.column_config.DateColumn("Data-ex", format="DD/MM/YYYY"),
+                    "valor_cota": st.column_config.NumberColumn("Por cota", format="R$ %.4f"),
+                    "recebido": st.column_config.NumberColumn("Recebido", format="R$ %.2f"),
+                },
+                use_container_width=True, hide_index=True
+            )
+
         st.divider()
         st.subheader("Importar Modelo")
         mod = st.selectbox("Escolha:", ["..."] + list(CARTEIRAS_PRONTAS.keys()))
         if st.button("Aplicar Modelo"):
             if mod != "...":
                 novos = CARTEIRAS_PRONTAS[mod]
-                for t, m in novos.items():
-                    if t not in carteira_completa: carteira_completa[t] = {'qtde':0, 'meta_pct':m, 'pm':0.0, 'divs':0.0, 'teto':0.0}
+                carteira_completa.aplicar({t: {'meta_pct': m} for t, m in novos.items() if t not in carteira_completa})
                 salvar_carteira(carteira_completa)
-                st.session_state['carteira_cache'] = carteira_completa
                 st.toast("Modelo aplicado!")
                 time.sleep(1); st.rerun()
 
-    if modo_live: time.sleep(60); st.rerun()
\ No newline at end of file
+# Fecha a rodada antes de desenhar o painel, para ele já mostrar este rerun
+rastreador.fechar_rodada(st.session_state['id_sessao'])
+if st.session_state['logado']:
+    with st.sidebar: painel_desempenho()
@@ -0,0 +1,244 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import closing
+
+from desempenho import rastreador
+
+# --- CONSTANTES ---
+CAMINHO_BANCO = os.environ.get("ROBO_DB", os.path.join("dados", "carteira_robo.db"))
+INTERVALO_SINCRONIA = 60.0  # segundos entre reconciliações com a planilha
+JANELA_ESCRITA = 2.0  # segundos sem edição antes de sincronizar
+CAMPOS_CARTEIRA = ['qtde', 'meta_pct', 'pm', 'divs', 'teto']
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS carteira (
+    ticker TEXT PRIMARY KEY,
+    posicao INTEGER NOT NULL,
+    qtde INTEGER NOT NULL DEFAULT 0,
+    meta_pct INTEGER NOT NULL DEFAULT 0,
+    pm REAL NOT NULL DEFAULT 0,
+    divs REAL NOT NULL DEFAULT 0,
+    teto REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS config (chave TEXT PRIMARY KEY, valor TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS sincronia (chave TEXT PRIMARY KEY, valor TEXT NOT NULL);
+"""
+
+# planilha.py puxa gspread/oauth2client: só quem fala com o Google paga o import
+def _planilha():
+    import planilha
+    return planilha
+
+# Todo armazenamento expõe a mesma interface:
+#   carregar_carteira() -> {ticker: {...}}     salvar_carteira(carteira)
+#   carregar_config()   -> {...} ou None        salvar_config(conf)
+
+
+# --- BANCO LOCAL (SQLITE) ---
+class ArmazenamentoLocal:
+    def __init__(self, caminho=CAMINHO_BANCO):
+        self.caminho = caminho
+        pasta = os.path.dirname(caminho)
+        if pasta: os.makedirs(pasta, exist_ok=True)
+        with closing(self._conectar()) as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(ESQUEMA)
+
+    def _conectar(self):
+        return sqlite3.connect(self.caminho, timeout=10)
+
+    def _meta(self, con, chave, padrao=None):
+        linha = con.execute("SELECT valor FROM sincronia WHERE chave = ?", (chave,)).fetchone()
+        return json.loads(linha[0]) if linha else padrao
+
+    def _gravar_meta(self, con, chave, valor):
+        con.execute("INSERT OR REPLACE INTO sincronia (chave, valor) VALUES (?, ?)", (chave, json.dumps(valor)))
+
+    def _ler_carteira(self, con):
+        linhas = con.execute("SELECT ticker, qtde, meta_pct, pm, divs, teto FROM carteira ORDER BY posicao")
+        return {t: dict(zip(CAMPOS_CARTEIRA, valores)) for t, *valores in linhas}
+
+    def _ler_config(self, con):
+        linhas = con.execute("SELECT chave, valor FROM config").fetchall()
+        return {k: json.loads(v) for k, v in linhas} or None
+
+    def _gravar_carteira(self, con, carteira):
+        atual = self._ler_carteira(con)
+        posicao = {t: i for i, t in enumerate(atual)}
+        if atual == carteira and list(atual) == list(carteira): return False
+        removidos = [(t,) for t in atual if t not in carteira]
+        if removidos: con.executemany("DELETE FROM carteira WHERE ticker = ?", removidos)
+        con.executemany(
+            "INSERT INTO carteira (ticker, posicao, qtde, meta_pct, pm, divs, teto) VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(ticker) DO UPDATE SET posicao=excluded.posicao, qtde=excluded.qtde, meta_pct=excluded.meta_pct, "
+            "pm=excluded.pm, divs=excluded.divs, teto=excluded.teto",
+            [(t, i, int(d['qtde']), int(d['meta_pct']), float(d.get('pm', 0.0)), float(d.get('divs', 0.0)), float(d.get('teto', 0.0)))
+             for i, (t, d) in enumerate(carteira.items()) if posicao.get(t) != i or atual[t] != d]
+        )
+        return True
+
+    def _gravar_config(self, con, conf):
+        if self._ler_config(con) == conf: return False
+        con.execute("DELETE FROM config")
+        con.executemany("INSERT INTO config (chave, valor) VALUES (?, ?)", [(k, json.dumps(v)) for k, v in conf.items()])
+        return True
+
+    # Cada gravação que muda algo incrementa a versão local; o sincronizador
+    # usa isso para não sobrescrever uma edição feita durante a reconciliação.
+    def _gravar(self, carteira=None, conf=None, se_versao=None):
+        with closing(self._conectar()) as con, con:
+            con.execute("BEGIN IMMEDIATE")
+            versao = self._meta(con, "versao", 0)
+            if se_versao is not None and versao != se_versao: return False
+            mudou = carteira is not None and self._gravar_carteira(con, carteira)
+            mudou = (conf is not None and self._gravar_config(con, conf)) or mudou
+            if mudou: self._gravar_meta(con, "versao", versao + 1)
+            return True
+
+    def versao(self):
+        with closing(self._conectar()) as con: return self._meta(con, "versao", 0)
+
+    def carregar_carteira(self):
+        with closing(self._conectar()) as con: return self._ler_carteira(con)
+
+    def salvar_carteira(self, carteira): self._gravar(carteira=carteira)
+
+    def carregar_config(self):
+        with closing(self._conectar()) as con: return self._ler_config(con)
+
+    def salvar_config(self, conf): self._gravar(conf=conf)
+
+    def aplicar(self, carteira, conf, se_versao):
+        # Grava o resultado de uma reconciliação só se não houve edição desde a leitura
+        return self._gravar(carteira=carteira, conf=conf, se_versao=se_versao)
+
+    # Base da mescla de três vias: o último estado em que local e planilha concordavam
+    def base(self):
+        with closing(self._conectar()) as con:
+            return self._meta(con, "base_carteira"), self._meta(con, "base_config")
+
+    def gravar_base(self, carteira, conf):
+        with closing(self._conectar()) as con, con:
+            self._gravar_meta(con, "base_carteira", carteira)
+            self._gravar_meta(con, "base_config", conf)
+            self._gravar_meta(con, "ultima_sincronia", time.time())
+
+    def ja_sincronizado(self):
+        with closing(self._conectar()) as con: return self._meta(con, "ultima_sincronia") is not None
+
+
+# --- RÉPLICA NO GOOGLE SHEETS ---
+class ArmazenamentoSheets:
+    def __init__(self, conexao):
+        self.conexao = conexao
+        self.escrita = _planilha().EscritaPorDiferenca(conexao)
+
+    def carregar_carteira(self):
+        planilha = _planilha()
+        grade = self.conexao.executar(lambda: self.conexao.aba_carteira().get_all_values(
+            value_render_option=planilha.ValueRenderOption.unformatted))
+        self.escrita.definir_base(grade)
+        return planilha.carteira_de_registros(planilha.registros_da_grade(grade))
+
+    def salvar_carteira(self, carteira):
+        self.escrita.gravar(carteira)
+
+    def carregar_config(self):
+        return _planilha().carregar_config(self.conexao)
+
+    def salvar_config(self, conf):
+        _planilha().salvar_config(self.conexao, conf)
+
+
+# --- RECONCILIAÇÃO ---
+def mesclar(base, local, remoto):
+    # Mescla de três vias por chave: vence o lado que mudou em relação à base.
+    # Se os dois mudaram a mesma chave de formas diferentes, fica o local e a
+    # chave é reportada como conflito.
+    base = base or {}
+    resultado, conflitos = {}, []
+    for k in list(local) + [k for k in remoto if k not in local]:
+        b, l, r = base.get(k), local.get(k), remoto.get(k)
+        if l == r: v = l
+        elif l == b: v = r
+        elif r == b: v = l
+        else:
+            v = l
+            conflitos.append(k)
+        if v is not None: resultado[k] = v
+    return resultado, conflitos
+
+def _em_dict(conf): return {} if conf is None else {"config": conf}
+
+
+class SincronizadorSheets:
+    def __init__(self, local, remoto, intervalo=INTERVALO_SINCRONIA, atraso=JANELA_ESCRITA):
+        self.local = local
+        self.remoto = remoto
+        self.intervalo = intervalo
+        self.atraso = atraso
+        self.primeira_tentativa = threading.Event()
+        self._aviso = threading.Event()
+        self._trava = threading.Lock()
+        self._thread = None
+        self.conflitos = []
+        self.ultimo_erro = None
+        self.ultima_sincronia = None
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._laco, name="sincronia-sheets", daemon=True)
+            self._thread.start()
+
+    def avisar(self):
+        # Houve edição local: sincroniza após a janela de debounce
+        self._aviso.set()
+
+    def _laco(self):
+        # Banco local nunca sincronizado: a primeira reconciliação já sai na partida
+        if not self.local.ja_sincronizado(): self.tentar_sincronizar()
+        while True:
+            if self._aviso.wait(self.intervalo):
+                time.sleep(self.atraso)
+                self._aviso.clear()
+            self.tentar_sincronizar()
+
+    def sincronizar(self):
+        with self._trava:
+            versao = self.local.versao()
+            base_cart, base_conf = self.local.base()
+            loc_cart, loc_conf = self.local.carregar_carteira(), self.local.carregar_config()
+            rem_cart, rem_conf = self.remoto.carregar_carteira(), self.remoto.carregar_config()
+
+            cart, conflitos = mesclar(base_cart, loc_cart, rem_cart)
+            confs, conflitos_conf = mesclar(_em_dict(base_conf), _em_dict(loc_conf), _em_dict(rem_conf))
+            conf = confs.get("config")
+
+            # Local primeiro, condicionado à versão lida: se o usuário editou no
+            # meio do caminho, desiste desta rodada sem tocar na planilha.
+            if not self.local.aplicar(cart, conf, se_versao=versao): return False
+            if cart != rem_cart: self.remoto.salvar_carteira(cart)
+            if conf is not None and conf != rem_conf: self.remoto.salvar_config(conf)
+
+            # A base só avança depois que a planilha recebeu o resultado
+            self.local.gravar_base(cart, conf)
+            self.conflitos = conflitos + ["Config" for _ in conflitos_conf]
+            self.ultima_sincronia = time.time()
+            self.ultimo_erro = None
+            return True
+
+    def tentar_sincronizar(self):
+        try:
+            with rastreador.etapa("sincronia"): return self.sincronizar()
+        except Exception as e:
+            self.ultimo_erro = e
+            return False
+        finally:
+            self.primeira_tentativa.set()
+
+    def aguardar_primeira(self, timeout=None):
+        # Para quem precisa dos dados da planilha antes de seguir (ex.: login no 1º uso)
+        return self.primeira_tentativa.wait(timeout)
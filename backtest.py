@@ -0,0 +1,156 @@
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from alocacao import alocar
+from constantes import CARTEIRAS_PRONTAS
+
+# --- BACKTEST DAS ESTRATÉGIAS ---
+# Reproduz, mês a mês, o aporte + a regra gulosa por meta_pct do calcular_compras
+# sobre matrizes de preços (pregões x tickers). Cada cenário roda num processo.
+
+DIAS_UTEIS_ANO = 252
+
+
+def carregar_matrizes(historico, tickers, inicio=None, fim=None):
+    # Preço de fechamento (sem ajuste) e proventos por cota, alinhados por pregão
+    precos = historico.matriz(tickers, "Close", inicio, fim)
+    if precos.empty: return precos, precos
+    proventos = historico.matriz(list(precos.columns), "Dividends", inicio, fim).reindex_like(precos).fillna(0.0)
+    return precos.ffill(), proventos
+
+
+def dias_de_aporte(datas):
+    # Primeiro pregão de cada mês
+    datas = pd.DatetimeIndex(datas)
+    meses = datas.to_period("M")
+    return np.flatnonzero(np.r_[True, meses[1:] != meses[:-1]])
+
+
+def simular_estrategia(precos, proventos, metas, aporte, reinvestir=True):
+    tickers = [t for t in metas if t in precos.columns]
+    if not tickers or precos.empty: return None
+    p = precos[tickers].to_numpy(dtype=float)
+    d = proventos[tickers].to_numpy(dtype=float)
+    m = np.array([metas[t] for t in tickers], dtype=float)
+    n_dias, n_ativos = p.shape
+    idx_aporte = dias_de_aporte(precos.index)
+
+    # Quantidade em carteira vale a partir do pregão da compra até o próximo aporte
+    qtd = np.zeros(n_ativos)
+    qtd_dia = np.zeros((n_dias, n_ativos))
+    caixa_dia = np.zeros(n_dias)
+    aportes = np.zeros(n_dias)
+    custo = 0.0
+    caixa = 0.0
+    limites = np.r_[idx_aporte, n_dias]
+    for k, i in enumerate(idx_aporte):
+        if reinvestir and k > 0:
+            # Proventos pagos desde o aporte anterior entram no caixa deste mês
+            ini = limites[k - 1]
+            caixa += float((d[ini:i] * qtd_dia[ini:i]).sum())
+        caixa += aporte
+        aportes[i] = aporte
+        # Só ativos com preço no dia participam da alocação
+        ok = ~np.isnan(p[i])
+        if ok.any():
+            precos_i = p[i, ok]
+            patr_sim = float(qtd[ok] @ precos_i) + caixa
+            compras, custos, caixa = alocar(qtd[ok].tolist(), m[ok].tolist(), precos_i.tolist(), caixa, patr_sim)
+            qtd[ok] += compras
+            custo += sum(custos)
+        qtd_dia[i:limites[k + 1]] = qtd
+        caixa_dia[i:limites[k + 1]] = caixa
+
+    # Provento entra no caixa na data-com; reinvestindo, só é usado no próximo aporte
+    div_dia = np.nansum(d * qtd_dia, axis=1)
+    div_acum = np.cumsum(div_dia)
+    if reinvestir:
+        ini = np.repeat(idx_aporte, np.diff(limites))
+        caixa_dia = caixa_dia + div_acum - np.where(ini > 0, div_acum[ini - 1], 0.0)
+    else: caixa_dia = caixa_dia + div_acum
+    patrimonio = np.nansum(p * qtd_dia, axis=1) + caixa_dia
+    investido = np.cumsum(aportes)
+
+    # Cota (retorno ponderado no tempo): tira o efeito dos aportes
+    anterior = np.r_[np.nan, patrimonio[:-1]]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ret = np.where(anterior > 0, (patrimonio - aportes) / anterior - 1, 0.0)
+    cota = np.cumprod(1 + ret)
+    drawdown = cota / np.maximum.accumulate(cota) - 1
+
+    curva = pd.DataFrame({
+        "patrimonio": patrimonio, "investido": investido, "cota": cota,
+        "drawdown": drawdown, "proventos": div_acum,
+    }, index=precos.index)
+
+    ultimo_ano = precos.index >= precos.index[-1] - pd.DateOffset(years=1)
+    anos = max((precos.index[-1] - precos.index[0]).days / 365.25, 1 / 12)
+    metricas = {
+        "patrimonio_final": patrimonio[-1],
+        "total_investido": investido[-1],
+        "lucro": patrimonio[-1] - investido[-1],
+        "retorno_cota_pct": (cota[-1] - 1) * 100,
+        "retorno_anual_pct": (cota[-1] ** (1 / anos) - 1) * 100,
+        "volatilidade_pct": float(np.std(ret[1:], ddof=1) * np.sqrt(DIAS_UTEIS_ANO) * 100) if n_dias > 2 else 0.0,
+        "max_drawdown_pct": float(drawdown.min() * 100),
+        "proventos_totais": float(div_dia.sum()),
+        "yoc_12m_pct": float(div_dia[ultimo_ano].sum() / custo * 100) if custo > 0 else 0.0,
+    }
+    return {"curva": curva, "metricas": metricas}
+
+
+# --- EXECUÇÃO PARALELA ---
+# As matrizes vão uma vez para cada processo (initializer), não a cada cenário
+_MATRIZES = {}
+
+def _iniciar_processo(precos, proventos):
+    _MATRIZES["precos"], _MATRIZES["proventos"] = precos, proventos
+
+def _rodar_cenario(cenario):
+    res = simular_estrategia(_MATRIZES["precos"], _MATRIZES["proventos"], cenario["metas"],
+                             cenario["aporte"], cenario.get("reinvestir", True))
+    return cenario["nome"], res
+
+def cenarios_varredura(estrategias, aportes, reinvestir=(True,)):
+    # Produto estratégia x aporte x reinvestimento
+    return [
+        {"nome": f"{nome} | R$ {a:,.0f}" + ("" if r else " | sem reinvestir"), "estrategia": nome,
+         "metas": metas, "aporte": a, "reinvestir": r}
+        for nome, metas in estrategias.items() for a in aportes for r in reinvestir
+    ]
+
+def rodar_backtests(precos, proventos, cenarios, processos=None):
+    # Retorna {nome do cenário: {"curva": DataFrame, "metricas": dict}} (None se sem dados)
+    processos = processos or os.cpu_count() or 1
+    if processos == 1 or len(cenarios) == 1:
+        _iniciar_processo(precos, proventos)
+        return dict(map(_rodar_cenario, cenarios))
+    with ProcessPoolExecutor(max_workers=min(processos, len(cenarios)), initializer=_iniciar_processo,
+                             initargs=(precos, proventos)) as pool:
+        return dict(pool.map(_rodar_cenario, cenarios))
+
+def tabela_metricas(resultados):
+    return pd.DataFrame({nome: r["metricas"] for nome, r in resultados.items() if r}).T
+
+
+if __name__ == "__main__":
+    from historico import HistoricoPrecos
+
+    parser = argparse.ArgumentParser(description="Backtest das CARTEIRAS_PRONTAS com aportes mensais")
+    parser.add_argument("--anos", type=int, default=10)
+    parser.add_argument("--aporte", type=float, nargs="+", default=[1000.0])
+    parser.add_argument("--sem-reinvestir", action="store_true")
+    parser.add_argument("--processos", type=int, default=None)
+    args = parser.parse_args()
+
+    hist = HistoricoPrecos()
+    tickers = sorted({t for metas in CARTEIRAS_PRONTAS.values() for t in metas})
+    inicio = (pd.Timestamp.today() - pd.DateOffset(years=args.anos)).normalize()
+    precos, proventos = carregar_matrizes(hist, tickers, inicio)
+    if precos.empty: raise SystemExit("Sem histórico local: rode a atualização do histórico antes.")
+    cenarios = cenarios_varredura(CARTEIRAS_PRONTAS, args.aporte, (not args.sem_reinvestir,))
+    print(tabela_metricas(rodar_backtests(precos, proventos, cenarios, args.processos)).round(2).to_string())
@@ -0,0 +1,236 @@
+import os
+import ast
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from statistics import median
+
+import numpy as np
+import pandas as pd
+import requests
+
+import analise
+import lote
+import cotacoes
+import planilha
+import simulador
+from desempenho import Rastreador
+from alocacao import calcular_compras
+from tests.test_alocacao import calcular_compras_referencia
+from benchmarks.stubs import ConexaoFalsa, ServidorYahooFalso, carteira_sintetica, precos_sinteticos
+
+# --- BENCHMARKS DOS CAMINHOS QUENTES (SEM REDE) ---
+# Uso: python -m benchmarks.bench [--rapido] [--saida arq.json] [--comparar anterior.json]
+
+PASTA_RESULTADOS = os.path.join("dados", "bench")
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTADOS = []
+
+
+def medir(fn, repeticoes=3):
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        fn()
+        tempos.append(time.perf_counter() - t0)
+    return min(tempos), median(tempos)
+
+def registrar(grupo, caso, tempos, **extra):
+    melhor, mediana = tempos
+    RESULTADOS.append({"grupo": grupo, "caso": caso, "melhor_s": melhor, "mediana_s": mediana, **extra})
+    detalhes = " ".join(f"{k}={v}" for k, v in extra.items())
+    print(f"{grupo:<18} {caso:<40} {melhor * 1000:>10.2f} ms  {detalhes}")
+
+
+# --- IMPLEMENTAÇÕES ANTIGAS (LINHA DE BASE) ---
+def _cotacao_legado(ticker, url_base):
+    # Uma conexão nova por ticker, em série, como o app fazia antes
+    try:
+        r = requests.get(f"{url_base}/{ticker}.SA?interval=1d&range=1d", headers={'User-Agent': 'Mozilla/5.0'}, timeout=3)
+        if r.status_code == 200: return float(r.json()['chart']['result'][0]['meta']['regularMarketPrice'])
+    except Exception: return 0.0
+    return 0.0
+
+def _metricas_legado(df):
+    df = df.copy()
+    df['total_atual'] = df['qtde'] * df['preco_atual']
+    df['total_inv'] = df['qtde'] * df['pm']
+    df['lucro_cota'] = df['total_atual'] - df['total_inv']
+    df['lucro_real'] = df['lucro_cota'] + df['divs']
+    df['rentab_pct'] = df.apply(lambda x: (x['lucro_real']/x['total_inv'])*100 if x['total_inv']>0 else 0, axis=1)
+    df['yoc_pct'] = df.apply(lambda x: (x['divs']/x['total_inv'])*100 if x['total_inv']>0 else 0, axis=1)
+    df['setor'] = df.index.map(analise.obter_setor)
+    df['link_analise'] = df.index.map(analise.obter_link_investidor10)
+    return df
+
+def _bola_de_neve_legado(patr, aporte_sim, taxa_anual, anos):
+    taxa_mensal = (1 + taxa_anual/100)**(1/12) - 1
+    total = total_investido = patr
+    evolucao = []
+    for m in range(anos * 12):
+        total = total * (1 + taxa_mensal) + aporte_sim
+        total_investido += aporte_sim
+        if m % 12 == 0: evolucao.append({"Ano": (m//12)+1, "Total Acumulado": total, "Total Investido": total_investido})
+    evolucao.append({"Ano": anos, "Total Acumulado": total, "Total Investido": total_investido})
+    return pd.DataFrame(evolucao)
+
+
+def _df_carteira(n):
+    carteira = carteira_sintetica(n)
+    df = pd.DataFrame.from_dict(carteira, orient='index')
+    df['preco_atual'] = df.index.map(precos_sinteticos(df.index))
+    return df
+
+
+# --- CASOS ---
+def bench_carregar_carteira(tamanhos):
+    for n in tamanhos:
+        conexao = ConexaoFalsa(carteira_sintetica(n))
+        registrar("carregar_carteira", f"{n} tickers", medir(lambda: planilha.carregar_carteira(conexao)))
+
+def bench_cotacoes(tamanhos, latencia, serial_ate):
+    with ServidorYahooFalso(latencia=latencia) as servidor:
+        url_original = cotacoes.URL_YAHOO
+        cotacoes.URL_YAHOO = servidor.url
+        try:
+            for n in tamanhos:
+                tickers = [f"T{i:05d}" for i in range(n - 1)] + ["ERRO1"]
+                precos, erros = cotacoes.obter_precos(tickers)
+                registrar("cotacoes", f"{n} tickers (pool) lat={latencia * 1000:.0f}ms",
+                          medir(lambda: cotacoes.obter_precos(tickers), 1), ok=len(precos), erros=len(erros))
+                # Falhas não ficam no cache: o caminho quente usa só os tickers com preço
+                cache = cotacoes.CacheCotacoes(ttl=60)
+                cache.obter(list(precos))
+                registrar("cotacoes", f"{n} tickers (cache quente)", medir(lambda: cache.obter(list(precos))))
+                if n <= serial_ate:
+                    registrar("cotacoes", f"{n} tickers (serial antigo)",
+                              medir(lambda: [_cotacao_legado(t, servidor.url) for t in tickers], 1))
+        finally:
+            cotacoes.URL_YAHOO = url_original
+
+def bench_calcular_compras(tamanhos, aportes, referencia_ate):
+    for n in tamanhos:
+        df = _df_carteira(n)
+        for aporte in aportes:
+            res, sobra = calcular_compras(df, aporte)
+            extra = {"cotas": int(res['comprar_qtd'].sum())}
+            if n <= referencia_ate and aporte <= 10_000:
+                ref, sobra_ref = calcular_compras_referencia(df, aporte)
+                extra["equivalente"] = bool((ref['comprar_qtd'] == res['comprar_qtd']).all() and sobra_ref == sobra)
+                registrar("calcular_compras", f"{n} tickers R$ {aporte:,.0f} (antigo)",
+                          medir(lambda: calcular_compras_referencia(df, aporte), 1))
+            registrar("calcular_compras", f"{n} tickers R$ {aporte:,.0f}", medir(lambda: calcular_compras(df, aporte)), **extra)
+
+def bench_metricas(tamanhos, antigo_ate):
+    for n in tamanhos:
+        df = _df_carteira(n)
+        registrar("metricas", f"{n} tickers", medir(lambda: analise.calcular_metricas(df)))
+        if n <= antigo_ate: registrar("metricas", f"{n} tickers (apply antigo)", medir(lambda: _metricas_legado(df)))
+
+def bench_simulador(caminhos):
+    registrar("simulador", "loop antigo 30 anos", medir(lambda: _bola_de_neve_legado(10_000.0, 1000.0, 10.0, 30)))
+    def deterministico():
+        simulador.simular_deterministico.cache_clear()
+        simulador.simular_deterministico(10_000.0, 1000.0, 10.0, 30)
+    registrar("simulador", "fórmula fechada 30 anos", medir(deterministico))
+    for c in caminhos:
+        def monte_carlo():
+            simulador.simular_monte_carlo.cache_clear()
+            simulador.simular_monte_carlo(10_000.0, 1000.0, 10.0, 15.0, 30, caminhos=c)
+        registrar("simulador", f"monte carlo {c:,} x 360 meses", medir(monte_carlo, 1))
+    registrar("simulador", "monte carlo memoizado", medir(lambda: simulador.simular_monte_carlo(10_000.0, 1000.0, 10.0, 15.0, 30, caminhos=caminhos[-1])))
+
+def bench_rastreio(chamadas=100_000):
+    # Custo por chamada do rastreio desligado (o caminho de todo rerun) e ligado
+    for ativo in (False, True):
+        r = Rastreador(ativo=ativo, arquivo=None)
+        def spans():
+            for _ in range(chamadas):
+                with r.etapa("bench"): pass
+                r.contar("bench")
+        melhor, mediana = medir(spans)
+        registrar("rastreio", f"{chamadas:,} etapas+contadores ({'ligado' if ativo else 'desligado'})", (melhor, mediana),
+                  ns_por_chamada=round(melhor / chamadas * 1e9))
+
+def imports_do_app(caminho=os.path.join(RAIZ, "app.py")):
+    # Módulos importados no nível de topo do app.py, na ordem em que aparecem
+    with open(caminho, encoding="utf-8") as f: arvore = ast.parse(f.read())
+    modulos = []
+    for no in arvore.body:
+        if isinstance(no, ast.Import): modulos += [a.name for a in no.names]
+        elif isinstance(no, ast.ImportFrom) and no.module: modulos.append(no.module)
+    return list(dict.fromkeys(modulos))
+
+def bench_partida(repeticoes=3):
+    # Importações de uma partida a frio, cada uma num interpretador novo: o
+    # caminho até o formulário de login agora x o de antes (plotly + Google no topo)
+    modulos = imports_do_app()
+    login = "import " + ", ".join(modulos)
+    casos = {"login (imports do app)": login,
+             "login antigo (+plotly, gspread, oauth2client)": login + ", plotly.graph_objects, plotly.express, planilha"}
+    for caso, codigo in casos.items():
+        def partida():
+            subprocess.run([sys.executable, "-c", codigo], check=True, cwd=RAIZ)
+        registrar("partida", caso, medir(partida, repeticoes), modulos=len(modulos))
+
+def bench_lote(n_carteiras, tickers_por_carteira=50):
+    # Várias carteiras sintéticas sobre o mesmo universo: 1 processo x todos os núcleos
+    carteiras = {f"c{i}": carteira_sintetica(tickers_por_carteira, semente=i) for i in range(n_carteiras)}
+    precos = precos_sinteticos(sorted({t for c in carteiras.values() for t in c}))
+    for processos in dict.fromkeys([1, os.cpu_count() or 1]):
+        registrar("lote", f"{n_carteiras} carteiras x {tickers_por_carteira} tickers ({processos} proc)",
+                  medir(lambda: list(lote.rodar_lote(carteiras, precos, 10_000.0, processos)), 1))
+
+
+# --- RELATÓRIO ---
+def metadados():
+    try: commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError: commit = ""
+    return {"data": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": commit, "python": platform.python_version(),
+            "numpy": np.__version__, "pandas": pd.__version__, "plataforma": platform.platform(), "cpus": os.cpu_count()}
+
+def comparar(anterior, atual):
+    base = {(r["grupo"], r["caso"]): r["melhor_s"] for r in anterior["resultados"]}
+    print(f"\nComparação com {anterior['meta'].get('commit') or 'execução anterior'}:")
+    for r in atual:
+        antes = base.get((r["grupo"], r["caso"]))
+        if not antes: continue
+        razao = r["melhor_s"] / antes
+        marca = "  ⚠️ mais lento" if razao > 1.2 else ""
+        print(f"{r['grupo']:<18} {r['caso']:<40} {razao:>6.2f}x{marca}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks offline do Robô Investidor")
+    parser.add_argument("--rapido", action="store_true", help="tamanhos menores, para rodar em segundos")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--latencia", type=float, default=0.02, help="latência do Yahoo falso (s)")
+    parser.add_argument("--saida", default=None, help="arquivo JSON de resultados")
+    parser.add_argument("--comparar", default=None, help="JSON de uma execução anterior")
+    args = parser.parse_args(argv)
+
+    tamanhos = [10, 100, 1000] if args.rapido else args.tamanhos
+    bench_carregar_carteira(tamanhos)
+    bench_cotacoes([n for n in tamanhos if n <= 500] or [min(tamanhos)], args.latencia, serial_ate=100)
+    bench_calcular_compras(tamanhos, [1_000.0, 10_000.0, 100_000.0], referencia_ate=10 if args.rapido else 100)
+    bench_metricas(tamanhos, antigo_ate=1000 if args.rapido else 5000)
+    bench_simulador([10_000] if args.rapido else [10_000, 100_000])
+    bench_rastreio()
+    bench_partida()
+    bench_lote(50 if args.rapido else 500)
+
+    saida = args.saida or os.path.join(PASTA_RESULTADOS, time.strftime("bench_%Y%m%d_%H%M%S.json"))
+    if os.path.dirname(saida): os.makedirs(os.path.dirname(saida), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump({"meta": metadados(), "resultados": RESULTADOS}, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f: comparar(json.load(f), RESULTADOS)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import numpy as np
+from gspread.utils import a1_to_rowcol
+
+from constantes import SETORES
+from planilha import CABECALHO_CARTEIRA, CABECALHO_CONFIG, CONFIG_PADRAO
+
+# --- DADOS SINTÉTICOS ---
+def tickers_sinteticos(n):
+    reais = list(SETORES)
+    extras = [f"ZZ{i:04d}{'11' if i % 3 == 0 else '3'}" for i in range(max(0, n - len(reais)))]
+    return (reais + extras)[:n]
+
+def carteira_sintetica(n, semente=0):
+    rng = np.random.default_rng(semente)
+    return {
+        t: {'qtde': int(rng.integers(0, 500)), 'meta_pct': int(rng.integers(1, 10)),
+            'pm': round(float(rng.uniform(5, 80)), 2), 'divs': round(float(rng.uniform(0, 300)), 2),
+            'teto': round(float(rng.uniform(0, 60)), 2) if rng.random() < 0.3 else 0.0}
+        for t in tickers_sinteticos(n)
+    }
+
+def precos_sinteticos(tickers, semente=1):
+    rng = np.random.default_rng(semente)
+    return {t: round(float(rng.uniform(5, 120)), 2) for t in tickers}
+
+
+# --- GSPREAD FALSO ---
+# Mesma superfície usada por planilha.py, com contagem de chamadas e latência opcional
+class AbaFalsa:
+    def __init__(self, grade, latencia=0.0):
+        self.grade = [list(l) for l in grade]
+        self.latencia = latencia
+        self.chamadas = {}
+
+    def _chamar(self, nome):
+        self.chamadas[nome] = self.chamadas.get(nome, 0) + 1
+        if self.latencia: time.sleep(self.latencia)
+
+    def get_all_values(self, **kwargs):
+        # Como o Sheets: linhas vazias no fim da aba não vêm na leitura
+        self._chamar("get_all_values")
+        fim = len(self.grade)
+        while fim and not any(str(v) for v in self.grade[fim - 1]): fim -= 1
+        return [list(l) for l in self.grade[:fim]]
+
+    def get_all_records(self):
+        self._chamar("get_all_records")
+        cab = self.grade[0] if self.grade else []
+        return [dict(zip(cab, l)) for l in self.grade[1:]]
+
+    def clear(self):
+        self._chamar("clear")
+        self.grade = []
+
+    def update(self, valores, *args, **kwargs):
+        self._chamar("update")
+        self.grade = [list(l) for l in valores]
+
+    def batch_update(self, dados, **kwargs):
+        # Aplica cada intervalo ("B3:D3") a partir da célula do canto superior esquerdo
+        self._chamar("batch_update")
+        for d in dados:
+            r0, c0 = a1_to_rowcol(d['range'].split(':')[0])
+            for dr, valores in enumerate(d['values']):
+                r = r0 - 1 + dr
+                while len(self.grade) <= r: self.grade.append([])
+                linha = self.grade[r]
+                for dc, v in enumerate(valores):
+                    c = c0 - 1 + dc
+                    if len(linha) <= c: linha.extend([""] * (c + 1 - len(linha)))
+                    linha[c] = v
+
+
+class ConexaoFalsa:
+    def __init__(self, carteira=None, latencia=0.0):
+        # Células como texto com vírgula decimal, como chegam de uma planilha pt-BR
+        linhas = [list(CABECALHO_CARTEIRA)] + [
+            [t, str(d['qtde']), str(d['meta_pct']), f"{d['pm']}".replace('.', ','),
+             f"{d['divs']}".replace('.', ','), f"{d['teto']}".replace('.', ',')]
+            for t, d in (carteira or {}).items()
+        ]
+        self.carteira = AbaFalsa(linhas, latencia)
+        self.config = AbaFalsa([CABECALHO_CONFIG, [CONFIG_PADRAO["senha"], CONFIG_PADRAO["meta_mensal"]]], latencia)
+
+    def aba_carteira(self): return self.carteira
+    def aba_config(self): return self.config
+    def executar(self, operacao): return operacao()
+
+
+# --- SERVIDOR YAHOO FALSO ---
+# Imita o endpoint v8/finance/chart com latência configurável. Tickers que
+# começam com "ERRO" respondem 404; roteiro={ticker: [503, 429, ...]} faz as
+# primeiras requisições daquele ticker responderem esses códigos, em ordem.
+class ServidorYahooFalso:
+    def __init__(self, latencia=0.02, precos=None, roteiro=None):
+        self.latencia = latencia
+        self.precos = precos or {}
+        self.roteiro = {t: list(c) for t, c in (roteiro or {}).items()}
+        self.requisicoes = 0
+        self.por_ticker = {}
+        self._trava = threading.Lock()
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, como o Yahoo
+            # Cabeçalho e corpo saem em duas escritas; com Nagle ligado, o ACK
+            # atrasado somaria ~40 ms a cada requisição numa conexão reaproveitada
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                simbolo = self.path.split("?")[0].rstrip("/").split("/")[-1]
+                ticker = simbolo.replace(".SA", "")
+                with servidor._trava:
+                    servidor.requisicoes += 1
+                    servidor.por_ticker[ticker] = servidor.por_ticker.get(ticker, 0) + 1
+                    roteiro = servidor.roteiro.get(ticker)
+                    forcado = roteiro.pop(0) if roteiro else None
+                if servidor.latencia: time.sleep(servidor.latencia)
+                if forcado:
+                    codigo, corpo = forcado, {"chart": {"result": None, "error": {"code": str(forcado)}}}
+                elif ticker.startswith("ERRO"):
+                    codigo, corpo = 404, {"chart": {"result": None, "error": {"code": "Not Found"}}}
+                else:
+                    preco = servidor.precos.get(ticker, 10.0)
+                    codigo, corpo = 200, {"chart": {"result": [{"meta": {"symbol": simbolo, "regularMarketPrice": preco}}]}}
+                dados = json.dumps(corpo).encode()
+                self.send_response(codigo)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def log_message(self, *args): pass
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._http.daemon_threads = True
+        self._thread = threading.Thread(target=self._http.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._http.server_port}/v8/finance/chart"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._http.shutdown()
+        self._http.server_close()
@@ -0,0 +1,81 @@
+import pandas as pd
+
+from analise import setores
+from constantes import CARTEIRAS_PRONTAS
+
+# --- MODELO DA CARTEIRA ---
+# Um DataFrame tipado, indexado por ticker, que vive na sessão e é editado no
+# lugar. O dict de dicts só aparece na fronteira com o armazenamento.
+
+CAMPOS = ['qtde', 'meta_pct', 'pm', 'divs', 'teto']
+TIPOS = {'qtde': 'int64', 'meta_pct': 'int64', 'pm': 'float64', 'divs': 'float64', 'teto': 'float64'}
+PADRAO = {'qtde': 0, 'meta_pct': 0, 'pm': 0.0, 'divs': 0.0, 'teto': 0.0}
+TODAS = "Todas"
+PERSONALIZADOS = "Personalizados"
+
+# Índice fixo estratégia -> tickers, usado pelo filtro da tela
+TICKERS_POR_ESTRATEGIA = {nome: frozenset(pesos) for nome, pesos in CARTEIRAS_PRONTAS.items()}
+TICKERS_PRONTOS = frozenset().union(*TICKERS_POR_ESTRATEGIA.values())
+
+
+def _tabela(linhas):
+    # linhas: {ticker: {campo: valor}} -> DataFrame tipado com o setor já resolvido
+    df = pd.DataFrame.from_dict(linhas, orient='index', columns=CAMPOS).fillna(PADRAO).astype(TIPOS)
+    df.index = pd.Index(df.index, dtype=object, name='ticker')
+    df['setor'] = setores(df.index).to_numpy()
+    return df
+
+
+class Carteira:
+    def __init__(self, df=None):
+        self.df = _tabela({}) if df is None else df
+
+    @classmethod
+    def de_dict(cls, carteira):
+        return cls(_tabela(carteira))
+
+    def para_dict(self):
+        # Formato do armazenamento: {ticker: {qtde, meta_pct, pm, divs, teto}}
+        return {t: dict(zip(CAMPOS, (int(q), int(m), float(p), float(d), float(te))))
+                for t, q, m, p, d, te in self.df[CAMPOS].itertuples()}
+
+    def __len__(self): return len(self.df)
+    def __contains__(self, ticker): return ticker in self.df.index
+    def __iter__(self): return iter(self.df.index)
+
+    # --- CONSULTAS ---
+    def filtrar(self, selecao):
+        # Tickers das estratégias escolhidas (+ os fora de qualquer estratégia),
+        # na ordem da carteira; resolve com conjuntos, sem varrer listas
+        if not selecao or TODAS in selecao: return self.df.index
+        permitidos = set().union(*(TICKERS_POR_ESTRATEGIA.get(s, ()) for s in selecao))
+        if PERSONALIZADOS in selecao: permitidos.update(t for t in self.df.index if t not in TICKERS_PRONTOS)
+        return self.df.index[self.df.index.isin(permitidos)]
+
+    def visao(self, tickers=None):
+        return self.df.copy() if tickers is None else self.df.loc[tickers].copy()
+
+    def qtdes(self):
+        return self.df['qtde'].to_dict()
+
+    # --- EDIÇÃO INCREMENTAL ---
+    def adicionar(self, ticker, **campos):
+        if ticker in self: return False
+        self.df = pd.concat([self.df, _tabela({ticker: {**PADRAO, **campos}})])
+        return True
+
+    def aplicar(self, editados, removidos=()):
+        # editados: {ticker: {campo: valor}} (novos ou alterados). Só as células
+        # diferentes são escritas; devolve quantos ativos mudaram.
+        removidos = [t for t in removidos if t in self]
+        novos = {t: d for t, d in editados.items() if t not in self}
+        mudancas = len(removidos) + len(novos)
+        for t, d in editados.items():
+            if t in novos: continue
+            linha = self.df.loc[t]
+            diferentes = [c for c in CAMPOS if c in d and linha[c] != d[c]]
+            for c in diferentes: self.df.at[t, c] = d[c]
+            mudancas += bool(diferentes)
+        if removidos: self.df = self.df.drop(removidos)
+        if novos: self.df = pd.concat([self.df, _tabela(novos)])
+        return mudancas
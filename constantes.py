@@ -0,0 +1,31 @@
+# --- CONFIGURAÇÃO ---
+CONFIG_PADRAO = {"senha": "123456", "meta_mensal": 1000.00}
+
+# --- MAPEAMENTO DE SETORES ---
+SETORES = {
+    "WEGE3": "Indústria", "VALE3": "Mineração", "PSSA3": "Seguros",
+    "ITUB4": "Bancos", "ITSA4": "Bancos", "BBAS3": "Bancos",
+    "TAEE11": "Elétrica", "CPLE6": "Elétrica", "EGIE3": "Elétrica",
+    "IVVB11": "Dólar/Exterior", "BTLG11": "FII Logística",
+    "HGLG11": "FII Logística", "KNCR11": "FII Papel",
+    "MXRF11": "FII Híbrido", "XPML11": "FII Shopping",
+    "PETR4": "Petróleo", "CURY3": "Construção", "CXSE3": "Seguros",
+    "DIRR3": "Construção", "POMO4": "Indústria", "RECV3": "Petróleo"
+}
+
+# --- ESTRATÉGIAS ---
+CARTEIRAS_PRONTAS = {
+    "🏆 Carteira Recomendada IA": {
+        "WEGE3": 10, "ITUB4": 15, "VALE3": 10, "TAEE11": 10, "PSSA3": 5, 
+        "IVVB11": 20, "HGLG11": 10, "KNCR11": 10, "MXRF11": 10
+    },
+    "Carteira Dividendos (Rico)": {
+        "CURY3": 10, "CXSE3": 10, "DIRR3": 10, "ITSA4": 10, 
+        "ITUB4": 10, "PETR4": 10, "POMO4": 10, "RECV3": 10, "VALE3": 10
+    },
+    "Carteira FIIs (Rico)": {
+        "XPML11": 10, "RBRR11": 10, "RBRX11": 9, "XPCI11": 9,
+        "BTLG11": 6, "LVBI11": 6, "PCIP11": 6, "PVBI11": 6,
+        "KNCR11": 5, "BRCO11": 5, "XPLG11": 4, "KNSC11": 1
+    }
+}
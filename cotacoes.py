@@ -0,0 +1,204 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from desempenho import rastreador
+
+# --- CONSTANTES ---
+# YAHOO_CHART_URL permite apontar para um servidor local (stub) e medir sem rede
+URL_YAHOO = os.environ.get("YAHOO_CHART_URL", "https://query1.finance.yahoo.com/v8/finance/chart")
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+MAX_SIMULTANEAS = 8
+TIMEOUT = 3
+TENTATIVAS = 3
+BACKOFF = 0.5
+TTL_CACHE = float(os.environ.get("COTACAO_TTL", 45))
+MAX_ITENS_CACHE = 2000
+INTERVALO_LIVE = float(os.environ.get("INTERVALO_LIVE", 60))
+
+
+class ErroCotacao(Exception):
+    pass
+
+
+# --- SESSÃO HTTP COMPARTILHADA (KEEP-ALIVE) ---
+_sessao = None
+_trava_sessao = threading.Lock()
+
+def pegar_sessao():
+    global _sessao
+    with _trava_sessao:
+        if _sessao is None:
+            s = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=MAX_SIMULTANEAS, pool_maxsize=MAX_SIMULTANEAS)
+            s.mount("https://", adaptador)
+            s.mount("http://", adaptador)
+            s.headers.update(HEADERS)
+            _sessao = s
+        return _sessao
+
+def simbolo_yahoo(ticker):
+    return ticker if ticker.endswith(".SA") else f"{ticker}.SA"
+
+
+# --- COTAÇÃO INDIVIDUAL (COM RETRY/BACKOFF) ---
+def buscar_preco(ticker, timeout=TIMEOUT, tentativas=TENTATIVAS, backoff=BACKOFF):
+    url = f"{URL_YAHOO}/{simbolo_yahoo(ticker)}?interval=1d&range=1d"
+    erro = "sem resposta"
+    for i in range(tentativas):
+        if i: time.sleep(backoff * 2 ** (i - 1))
+        rastreador.contar("yahoo.requisicoes")
+        try:
+            r = pegar_sessao().get(url, timeout=timeout)
+        except requests.RequestException as e:
+            erro = f"falha de rede ({type(e).__name__})"
+            continue
+        if r.status_code == 200:
+            try: return float(r.json()['chart']['result'][0]['meta']['regularMarketPrice'])
+            except (ValueError, KeyError, IndexError, TypeError):
+                raise ErroCotacao("resposta sem regularMarketPrice")
+        erro = f"HTTP {r.status_code}"
+        # 4xx (exceto 429) não melhora repetindo
+        if r.status_code != 429 and r.status_code < 500: break
+    raise ErroCotacao(erro)
+
+
+# --- COTAÇÃO EM LOTE (CONCORRENTE) ---
+def obter_precos(tickers, max_simultaneas=MAX_SIMULTANEAS, timeout=TIMEOUT, tentativas=TENTATIVAS, backoff=BACKOFF):
+    # Retorna (precos, erros): {ticker: preço} e {ticker: motivo da falha}
+    precos, erros = {}, {}
+    unicos = list(dict.fromkeys(tickers))
+    if not unicos: return precos, erros
+
+    def tarefa(t):
+        t0 = time.perf_counter()
+        try: precos[t] = buscar_preco(t, timeout=timeout, tentativas=tentativas, backoff=backoff)
+        except ErroCotacao as e: erros[t] = str(e)
+        rastreador.cotacao(t, time.perf_counter() - t0, t in precos)
+
+    with ThreadPoolExecutor(max_workers=min(max_simultaneas, len(unicos))) as pool:
+        list(pool.map(tarefa, unicos))
+    return precos, erros
+
+
+# --- CACHE COMPARTILHADO (TTL + LRU + SINGLE-FLIGHT) ---
+class CacheCotacoes:
+    def __init__(self, ttl=TTL_CACHE, max_itens=MAX_ITENS_CACHE, buscar=obter_precos):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self._buscar = buscar
+        self._itens = OrderedDict()  # ticker -> (preço, timestamp da busca)
+        self._em_voo = {}            # ticker -> Future da busca em andamento
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.compartilhadas = 0
+
+    def obter(self, tickers, max_idade=None):
+        # Retorna (cotacoes, erros): {ticker: (preço, timestamp)} e {ticker: motivo}
+        # max_idade sobrepõe o TTL (0 força buscar de novo o que não está em voo)
+        agora = time.time()
+        max_idade = self.ttl if max_idade is None else max_idade
+        cotacoes, erros, aguardar, minhas = {}, {}, {}, {}
+        with self._trava:
+            for t in dict.fromkeys(tickers):
+                item = self._itens.get(t)
+                if item is not None and agora - item[1] < max_idade:
+                    self._itens.move_to_end(t)
+                    cotacoes[t] = item
+                    self.acertos += 1
+                elif t in self._em_voo:
+                    # Outra sessão já está buscando: pega carona na mesma requisição
+                    aguardar[t] = self._em_voo[t]
+                    self.compartilhadas += 1
+                else:
+                    minhas[t] = self._em_voo[t] = Future()
+                    self.falhas += 1
+
+        if minhas:
+            precos, erros_busca = {}, {}
+            try:
+                with rastreador.etapa("cotacoes.busca"): precos, erros_busca = self._buscar(list(minhas))
+            except Exception as e:
+                erros_busca = {t: f"erro inesperado ({type(e).__name__})" for t in minhas}
+            finally:
+                ts = time.time()
+                with self._trava:
+                    for t in minhas:
+                        self._em_voo.pop(t, None)
+                        if t in precos:
+                            self._itens[t] = (precos[t], ts)
+                            self._itens.move_to_end(t)
+                    while len(self._itens) > self.max_itens: self._itens.popitem(last=False)
+                for t, f in minhas.items():
+                    if t in precos: f.set_result((precos[t], ts))
+                    else: f.set_exception(ErroCotacao(erros_busca.get(t, "sem resposta")))
+            aguardar.update(minhas)
+
+        for t, f in aguardar.items():
+            try: cotacoes[t] = f.result()
+            except ErroCotacao as e: erros[t] = str(e)
+        return cotacoes, erros
+
+    def estatisticas(self):
+        with self._trava:
+            return {"acertos": self.acertos, "falhas": self.falhas,
+                    "compartilhadas": self.compartilhadas, "itens": len(self._itens)}
+
+
+# Instância única do processo: compartilhada entre sessões e reruns do Streamlit
+cache_cotacoes = CacheCotacoes()
+
+
+# --- ATUALIZAÇÃO EM SEGUNDO PLANO (MODO LIVE) ---
+# Cada sessão em modo Live registra os tickers que está olhando; uma única
+# thread mantém o cache quente na menor cadência pedida, e a tela só lê do cache.
+class AgendadorCotacoes:
+    def __init__(self, cache, intervalo_padrao=INTERVALO_LIVE):
+        self.cache = cache
+        self.intervalo_padrao = intervalo_padrao
+        self._inscricoes = {}  # sessão -> (tickers, intervalo, último aviso)
+        self._trava = threading.Lock()
+        self._acordar = threading.Event()
+        self._thread = None
+        self.rodadas = 0
+
+    def acompanhar(self, sessao, tickers, intervalo=None):
+        intervalo = intervalo or self.intervalo_padrao
+        with self._trava:
+            anterior = self._inscricoes.get(sessao)
+            self._inscricoes[sessao] = (frozenset(tickers), intervalo, time.time())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._laco, name="agendador-cotacoes", daemon=True)
+                self._thread.start()
+        if anterior is None or anterior[1] != intervalo: self._acordar.set()
+
+    def cancelar(self, sessao):
+        with self._trava: self._inscricoes.pop(sessao, None)
+
+    def _ativos(self):
+        # Inscrição não renovada por 3 ciclos é de sessão que fechou ou saiu do Live
+        agora = time.time()
+        with self._trava:
+            for s, (_, intervalo, visto) in list(self._inscricoes.items()):
+                if agora - visto > 3 * intervalo: del self._inscricoes[s]
+            tickers = set().union(*(t for t, _, _ in self._inscricoes.values())) if self._inscricoes else set()
+            intervalo = min((i for _, i, _ in self._inscricoes.values()), default=self.intervalo_padrao)
+        return tickers, intervalo
+
+    def _laco(self):
+        while True:
+            tickers, intervalo = self._ativos()
+            if tickers:
+                self.cache.obter(tickers, max_idade=intervalo / 2)
+                self.rodadas += 1
+            self._acordar.wait(intervalo)
+            self._acordar.clear()
+
+
+agendador_cotacoes = AgendadorCotacoes(cache_cotacoes)
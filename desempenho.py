@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from contextlib import nullcontext
+
+# --- CONSTANTES ---
+# ROBO_RASTREIO=1 liga o rastreio desde o início; o painel "Desempenho" também liga/desliga
+ATIVO_PADRAO = os.environ.get("ROBO_RASTREIO", "") == "1"
+ARQUIVO_METRICAS = os.environ.get("ROBO_METRICAS", os.path.join("dados", "metricas.jsonl"))
+FORMATO_METRICAS = os.environ.get("ROBO_METRICAS_FORMATO", "jsonl")  # "jsonl" ou "prom"
+TAMANHO_MAX_ARQUIVO = int(os.environ.get("ROBO_METRICAS_MAX", 5 * 1024 * 1024))
+JANELA_AMOSTRAS = 200  # durações guardadas por etapa (para mediana/p95)
+
+_NULO = nullcontext()
+
+
+def _percentil(ordenadas, q):
+    return ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))]
+
+
+# --- ETAPA (SPAN) ---
+class _Etapa:
+    __slots__ = ("rastreador", "nome", "t0")
+
+    def __init__(self, rastreador, nome):
+        self.rastreador = rastreador
+        self.nome = nome
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.rastreador.registrar(self.nome, time.perf_counter() - self.t0)
+        return False
+
+
+# --- RASTREADOR ---
+# Um por processo. Desligado, etapa() devolve um contexto vazio compartilhado e
+# contar()/cotacao() retornam na primeira linha: o custo é um if por chamada.
+# Ligado, guarda as últimas durações de cada etapa, contadores acumulados e a
+# latência por ticker; cada rodada (rerun do script ou ciclo do Live) vira uma
+# linha no arquivo de métricas.
+class Rastreador:
+    def __init__(self, ativo=ATIVO_PADRAO, arquivo=ARQUIVO_METRICAS, formato=FORMATO_METRICAS, janela=JANELA_AMOSTRAS):
+        self.ativo = ativo
+        self.arquivo = arquivo
+        self.formato = formato
+        self.janela = janela
+        self._amostras = {}    # etapa -> deque das últimas durações
+        self._totais = {}      # etapa -> [n, soma] desde o início
+        self._contadores = {}  # nome -> total
+        self._cotacoes = {}    # ticker -> {"ultima", "media", "n", "falhas"}
+        self._trava = threading.Lock()
+        self._trava_arquivo = threading.Lock()
+        self._local = threading.local()
+        self.ultima_rodada = None
+        self.partida = {}      # etapa -> segundos, medidos uma vez por processo
+
+    def etapa(self, nome):
+        if not self.ativo: return _NULO
+        return _Etapa(self, nome)
+
+    def registrar(self, nome, segundos):
+        with self._trava:
+            amostras = self._amostras.get(nome)
+            if amostras is None: amostras = self._amostras[nome] = deque(maxlen=self.janela)
+            amostras.append(segundos)
+            total = self._totais.setdefault(nome, [0, 0.0])
+            total[0] += 1
+            total[1] += segundos
+        rodada = getattr(self._local, "rodada", None)
+        if rodada is not None: rodada["etapas"][nome] = rodada["etapas"].get(nome, 0.0) + segundos
+
+    def contar(self, nome, n=1):
+        if not self.ativo: return
+        with self._trava: self._contadores[nome] = self._contadores.get(nome, 0) + n
+
+    def cotacao(self, ticker, segundos, ok=True):
+        if not self.ativo: return
+        self.registrar("cotacoes.ticker", segundos)
+        with self._trava:
+            c = self._cotacoes.get(ticker)
+            if c is None: c = self._cotacoes[ticker] = {"ultima": segundos, "media": segundos, "n": 0, "falhas": 0}
+            c["n"] += 1
+            c["ultima"] = segundos
+            c["media"] += (segundos - c["media"]) / c["n"]
+            if not ok: c["falhas"] += 1
+
+    def marcar_partida(self, nome, segundos):
+        # Medidas de partida a frio: sempre guardadas (custo único), só a primeira vale
+        if nome in self.partida: return
+        self.partida[nome] = segundos
+        self.registrar(f"partida.{nome}", segundos)
+
+    # --- RODADAS ---
+    # A rodada é da thread que roda o script; etapas em outras threads (pool de
+    # cotações, sincronia) entram só nas estatísticas gerais.
+    def iniciar_rodada(self, tipo="rerun"):
+        # Sempre recomeça: uma rodada interrompida por st.rerun() é descartada
+        if not self.ativo:
+            self._local.rodada = None
+            return
+        with self._trava: contadores = dict(self._contadores)
+        self._local.rodada = {"tipo": tipo, "inicio": time.time(), "t0": time.perf_counter(),
+                              "etapas": {}, "contadores": contadores}
+
+    def fechar_rodada(self, sessao=None):
+        rodada = getattr(self._local, "rodada", None)
+        if rodada is None: return None
+        self._local.rodada = None
+        total = time.perf_counter() - rodada["t0"]
+        with self._trava:
+            antes = rodada["contadores"]
+            contadores = {k: v - antes.get(k, 0) for k, v in self._contadores.items() if v != antes.get(k, 0)}
+        self.registrar(f"rodada.{rodada['tipo']}", total)
+        registro = {
+            "ts": round(rodada["inicio"], 3), "sessao": sessao, "tipo": rodada["tipo"], "total_s": round(total, 6),
+            "etapas": {k: round(v, 6) for k, v in rodada["etapas"].items()}, "contadores": contadores,
+        }
+        self.ultima_rodada = registro
+        try: self.gravar(registro)
+        except OSError: pass  # métrica nunca derruba a tela
+        return registro
+
+    def rodada(self, tipo, sessao=None):
+        # Para trechos que rodam sozinhos (fragmento do Live); dentro de uma
+        # rodada já aberta não faz nada
+        if not self.ativo or getattr(self._local, "rodada", None) is not None: return _NULO
+        return _Rodada(self, tipo, sessao)
+
+    # --- LEITURAS ---
+    def etapas(self):
+        # [{etapa, n, ultima_ms, mediana_ms, p95_ms, max_ms, total_s}] por tempo total
+        with self._trava:
+            dados = {k: (sorted(v), v[-1], self._totais[k]) for k, v in self._amostras.items() if v}
+        linhas = [
+            {"etapa": k, "n": tot[0], "ultima_ms": ult * 1000, "mediana_ms": _percentil(o, 0.5) * 1000,
+             "p95_ms": _percentil(o, 0.95) * 1000, "max_ms": o[-1] * 1000, "total_s": tot[1]}
+            for k, (o, ult, tot) in dados.items()
+        ]
+        return sorted(linhas, key=lambda l: l["total_s"], reverse=True)
+
+    def contadores(self):
+        with self._trava: return dict(self._contadores)
+
+    def cotacoes_lentas(self, n=10):
+        with self._trava: itens = [dict(ticker=t, **c) for t, c in self._cotacoes.items()]
+        return sorted(itens, key=lambda c: c["ultima"], reverse=True)[:n]
+
+    def zerar(self):
+        with self._trava:
+            self._amostras.clear(); self._totais.clear(); self._contadores.clear(); self._cotacoes.clear()
+        self.ultima_rodada = None
+
+    # --- ARQUIVO DE MÉTRICAS ---
+    def gravar(self, registro):
+        if not self.arquivo: return
+        pasta = os.path.dirname(self.arquivo)
+        if pasta: os.makedirs(pasta, exist_ok=True)
+        with self._trava_arquivo:
+            if self.formato == "prom":
+                # Instantâneo no formato texto do Prometheus (textfile collector)
+                tmp = self.arquivo + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f: f.write(self.texto_prometheus())
+                os.replace(tmp, self.arquivo)
+                return
+            # JSON lines com rotação: passou do limite, vira .1 e recomeça
+            if os.path.exists(self.arquivo) and os.path.getsize(self.arquivo) > TAMANHO_MAX_ARQUIVO:
+                os.replace(self.arquivo, self.arquivo + ".1")
+            with open(self.arquivo, "a", encoding="utf-8") as f: f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+    def texto_prometheus(self):
+        linhas = ["# TYPE robo_etapa_segundos summary"]
+        for e in self.etapas():
+            rotulo = f'etapa="{e["etapa"]}"'
+            linhas.append(f'robo_etapa_segundos{{{rotulo},quantile="0.5"}} {e["mediana_ms"] / 1000:.6f}')
+            linhas.append(f'robo_etapa_segundos{{{rotulo},quantile="0.95"}} {e["p95_ms"] / 1000:.6f}')
+            linhas.append(f'robo_etapa_segundos_sum{{{rotulo}}} {e["total_s"]:.6f}')
+            linhas.append(f'robo_etapa_segundos_count{{{rotulo}}} {e["n"]}')
+        linhas.append("# TYPE robo_chamadas_total counter")
+        for nome, n in sorted(self.contadores().items()):
+            linhas.append(f'robo_chamadas_total{{nome="{nome}"}} {n}')
+        linhas.append("# TYPE robo_cotacao_segundos gauge")
+        for c in self.cotacoes_lentas(n=len(self._cotacoes)):
+            linhas.append(f'robo_cotacao_segundos{{ticker="{c["ticker"]}"}} {c["ultima"]:.6f}')
+        return "\n".join(linhas) + "\n"
+
+
+class _Rodada:
+    def __init__(self, rastreador, tipo, sessao):
+        self.rastreador, self.tipo, self.sessao = rastreador, tipo, sessao
+
+    def __enter__(self):
+        self.rastreador.iniciar_rodada(self.tipo)
+        return self
+
+    def __exit__(self, *exc):
+        self.rastreador.fechar_rodada(self.sessao)
+        return False
+
+
+# Instância única do processo
+rastreador = Rastreador()
@@ -0,0 +1,157 @@
+import os
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from constantes import SETORES
+
+# --- CONSTANTES ---
+PASTA_HISTORICO = os.environ.get("ROBO_HISTORICO", os.path.join("dados", "historico"))
+INICIO_PADRAO = "2010-01-01"
+COLUNAS = ["Open", "High", "Low", "Close", "Adj Close", "Volume", "Dividends", "Stock Splits"]
+TAMANHO_LOTE = 50  # tickers por chamada ao yfinance
+
+
+def tickers_padrao(carteira=None):
+    return sorted(set(SETORES) | set(carteira or {}))
+
+
+# --- ARMAZÉM DE HISTÓRICO (UM PARQUET POR TICKER) ---
+# Só baixa o que falta: cada ticker continua do dia seguinte à última barra
+# salva, e tickers com a mesma data de partida vão juntos num único download.
+class HistoricoPrecos:
+    def __init__(self, pasta=PASTA_HISTORICO):
+        self.pasta = pasta
+        os.makedirs(pasta, exist_ok=True)
+        self._memoria = {}  # ticker -> (mtime, DataFrame)
+        self._trava = threading.Lock()
+        self._trava_escrita = threading.Lock()  # um atualizar() por vez (botão, proventos, outras sessões)
+
+    def _caminho(self, ticker):
+        return os.path.join(self.pasta, f"{ticker}.parquet")
+
+    def ler(self, ticker, inicio=None, fim=None):
+        caminho = self._caminho(ticker)
+        if not os.path.exists(caminho): return pd.DataFrame(columns=COLUNAS)
+        mtime = os.path.getmtime(caminho)
+        with self._trava:
+            em_memoria = self._memoria.get(ticker)
+        if em_memoria is None or em_memoria[0] != mtime:
+            df = pd.read_parquet(caminho)
+            with self._trava: self._memoria[ticker] = (mtime, df)
+        else: df = em_memoria[1]
+        return df.loc[inicio:fim] if inicio or fim else df
+
+    def ultima_data(self, ticker):
+        df = self.ler(ticker)
+        return None if df.empty else df.index[-1].date()
+
+    def _gravar(self, ticker, novas, substituir=False):
+        antigas = pd.DataFrame() if substituir else self.ler(ticker)
+        df = novas if antigas.empty else pd.concat([antigas, novas])
+        df = df[~df.index.duplicated(keep='last')].sort_index()
+        tmp = f"{self._caminho(ticker)}.{os.getpid()}.tmp"
+        df.to_parquet(tmp)
+        os.replace(tmp, self._caminho(ticker))
+
+    def _baixar(self, yf, tickers, inicio):
+        # Um download por lote; retorna ({ticker: DataFrame}, {ticker: motivo da falha})
+        baixados, erros = {}, {}
+        for i in range(0, len(tickers), TAMANHO_LOTE):
+            lote = tickers[i:i + TAMANHO_LOTE]
+            try:
+                baixado = yf.download([f"{t}.SA" for t in lote], start=inicio.isoformat(), actions=True,
+                                      auto_adjust=False, group_by='ticker', threads=True, progress=False,
+                                      multi_level_index=True)
+            except Exception as e:
+                erros.update({t: f"falha no download ({type(e).__name__})" for t in lote})
+                continue
+            for t in lote:
+                simbolo = f"{t}.SA"
+                if baixado is None or simbolo not in baixado.columns.get_level_values(0):
+                    erros[t] = "sem dados"
+                    continue
+                df = baixado[simbolo].reindex(columns=COLUNAS).dropna(how='all', subset=["Open", "High", "Low", "Close"])
+                df.index = pd.DatetimeIndex(df.index).tz_localize(None).normalize()
+                baixados[t] = df[df.index.date >= inicio].astype("float64")
+        return baixados, erros
+
+    def _tem_eventos_novos(self, ticker, df):
+        # Provento/desdobramento ainda não guardado: Adj Close e Close das barras
+        # antigas mudaram no Yahoo e a série local ficaria com um degrau
+        acoes = df[["Dividends", "Stock Splits"]].fillna(0.0)
+        acoes = acoes[(acoes != 0).any(axis=1)]
+        if acoes.empty: return False
+        guardadas = self.ler(ticker).reindex(acoes.index)[["Dividends", "Stock Splits"]].fillna(0.0)
+        return not acoes.eq(guardadas).all(axis=None)
+
+    def atualizar(self, tickers, inicio_padrao=INICIO_PADRAO):
+        # Retorna ({ticker: barras novas}, {ticker: motivo da falha})
+        with self._trava_escrita: return self._atualizar(tickers, inicio_padrao)
+
+    def _atualizar(self, tickers, inicio_padrao):
+        import yfinance as yf  # só quem baixa dados paga o import
+
+        hoje = date.today()
+        inicio_total = pd.Timestamp(inicio_padrao).date()
+        grupos = {}
+        for t in dict.fromkeys(tickers):
+            # Recomeça da última barra: se ela foi gravada com o pregão aberto,
+            # o fechamento definitivo a substitui (keep='last' no _gravar)
+            ultima = self.ultima_data(t)
+            inicio = inicio_total if ultima is None else ultima
+            if inicio <= hoje: grupos.setdefault(inicio, []).append(t)
+
+        novas, erros, completos = {}, {}, []
+        for inicio, grupo in grupos.items():
+            baixados, erros_grupo = self._baixar(yf, grupo, inicio)
+            erros.update(erros_grupo)
+            for t, df in baixados.items():
+                ultima = self.ultima_data(t)
+                if df.empty and ultima is None:
+                    erros[t] = "sem dados"
+                    continue
+                if ultima is not None and self._tem_eventos_novos(t, df):
+                    completos.append(t)
+                    continue
+                if not df.empty: self._gravar(t, df)
+                novas[t] = int((df.index.date > ultima).sum()) if ultima else len(df)
+
+        # Quem teve provento/desdobramento novo baixa o histórico inteiro de novo
+        if completos:
+            baixados, erros_grupo = self._baixar(yf, completos, inicio_total)
+            erros.update(erros_grupo)
+            for t, df in baixados.items():
+                if df.empty: continue
+                antes = self.ultima_data(t)
+                self._gravar(t, df, substituir=True)
+                novas[t] = int((df.index.date > antes).sum())
+        return novas, erros
+
+    # --- LEITURAS PARA GRÁFICOS / ANÁLISES ---
+    def matriz(self, tickers, coluna="Close", inicio=None, fim=None):
+        # Datas x tickers, alinhado pelo calendário comum
+        series = {t: self.ler(t, inicio, fim)[coluna] for t in tickers}
+        series = {t: s for t, s in series.items() if not s.empty}
+        return pd.DataFrame(series).sort_index() if series else pd.DataFrame()
+
+    def dividendos(self, ticker, inicio=None):
+        df = self.ler(ticker, inicio)
+        if df.empty: return pd.Series(dtype=float)
+        d = df["Dividends"].fillna(0.0)
+        return d[d > 0]
+
+    def retornos_mensais(self, pesos, inicio=None):
+        # Retornos mensais (com proventos, via Adj Close) de uma carteira com pesos fixos
+        precos = self.matriz(list(pesos), "Adj Close", inicio).ffill()
+        if precos.empty: return pd.Series(dtype=float)
+        mensais = precos.resample("ME").last().pct_change().dropna(how='all')
+        w = pd.Series(pesos, dtype=float).reindex(mensais.columns).fillna(0.0)
+        if w.sum() <= 0: return pd.Series(dtype=float)
+        # Ativo sem histórico num mês: renormaliza entre os que têm
+        disponivel = mensais.notna()
+        pesos_mes = disponivel.mul(w, axis=1)
+        soma = pesos_mes.sum(axis=1).replace(0, np.nan)
+        return (mensais.fillna(0.0) * pesos_mes).sum(axis=1).div(soma).dropna()
@@ -0,0 +1,182 @@
+import os
+import sys
+import csv
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+
+import analise
+from alocacao import calcular_compras
+from carteira import Carteira, CAMPOS
+
+# --- ANÁLISE EM LOTE (SEM STREAMLIT) ---
+# Uso: python lote.py carteiras/*.csv dados/carteira_robo.db sheets:<chave> --aporte 1000 [--formato csv]
+# Carrega N carteiras, busca as cotações de todas numa única leva deduplicada e
+# roda Ordem de Compra + alertas de teto de cada uma num pool de processos,
+# escrevendo cada resultado assim que fica pronto.
+
+COLUNAS_PLANILHA = {"Ticker": "ticker", "Qtd": "qtde", "Meta": "meta_pct", "PM": "pm", "Divs": "divs", "Teto": "teto"}
+MAX_FONTES_SIMULTANEAS = 8
+
+
+# --- FONTES ---
+def carregar_csv(caminho):
+    # Aceita o cabeçalho da planilha (Ticker, Qtd, Meta...) ou o dos campos (ticker, qtde, meta_pct...)
+    df = pd.read_csv(caminho, dtype=str).rename(columns=COLUNAS_PLANILHA)
+    df['ticker'] = df['ticker'].fillna('').str.upper().str.strip().str.replace('.SA', '', regex=False)
+    df = df[df['ticker'] != ''].drop_duplicates('ticker', keep='last').set_index('ticker')
+    # Coluna ausente vira zero, como no parser da planilha
+    numeros = df.reindex(columns=CAMPOS, fill_value="").apply(
+        lambda c: pd.to_numeric(c.astype("string").str.replace(',', '.', regex=False), errors='coerce'))
+    return Carteira.de_dict(numeros.fillna(0).to_dict(orient='index')).para_dict()
+
+def carregar_local(caminho):
+    from armazenamento import ArmazenamentoLocal
+    # ArmazenamentoLocal cria o banco se não existir: caminho errado viraria carteira vazia
+    if not os.path.exists(caminho): raise FileNotFoundError(f"banco não encontrado: {caminho}")
+    return ArmazenamentoLocal(caminho).carregar_carteira()
+
+def carregar_sheets(chave, credenciais):
+    import planilha  # gspread/oauth2client só para esta fonte
+    if not credenciais: raise ValueError("fonte sheets: informe --credenciais (JSON da service account)")
+    with open(credenciais, encoding="utf-8") as f: creds = json.load(f)
+    return planilha.carregar_carteira(planilha.ConexaoSheets(creds, chave=chave))
+
+def carregar_fonte(fonte, credenciais=None):
+    # Retorna (nome, {ticker: {...}}); o tipo vem do prefixo/extensão
+    if fonte.startswith("sheets:"):
+        chave = fonte.split(":", 1)[1]
+        return f"sheets:{chave}", carregar_sheets(chave, credenciais)
+    nome = os.path.splitext(os.path.basename(fonte))[0]
+    if fonte.lower().endswith(".csv"): return nome, carregar_csv(fonte)
+    if fonte.lower().endswith((".db", ".sqlite")): return nome, carregar_local(fonte)
+    raise ValueError(f"fonte desconhecida: {fonte}")
+
+def carregar_fontes(fontes, credenciais=None):
+    # Retorna ({nome: carteira}, {fonte: erro}); fontes de rede carregam em paralelo
+    carteiras, erros = {}, {}
+    def tarefa(fonte):
+        try: return fonte, carregar_fonte(fonte, credenciais), None
+        except Exception as e: return fonte, None, f"{type(e).__name__}: {e}"
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_FONTES_SIMULTANEAS, len(fontes)))) as pool:
+        for fonte, carregada, erro in pool.map(tarefa, fontes):
+            if erro: erros[fonte] = erro; continue
+            nome, carteira = carregada
+            # Nomes repetidos (mesmo arquivo em pastas diferentes) ganham sufixo
+            base, i = nome, 2
+            while nome in carteiras: nome, i = f"{base}_{i}", i + 1
+            carteiras[nome] = carteira
+    return carteiras, erros
+
+
+# --- COTAÇÕES (UMA LEVA PARA TODAS AS CARTEIRAS) ---
+def buscar_cotacoes(carteiras):
+    import cotacoes
+    tickers = sorted({t for c in carteiras.values() for t in c})
+    return cotacoes.obter_precos(tickers)
+
+
+# --- ANÁLISE ---
+def _quadro(carteira, precos):
+    df = Carteira.de_dict(carteira).df
+    df['preco_atual'] = pd.Series(precos, dtype=float).reindex(df.index)
+    return df
+
+def analisar(carteiras, precos, aporte):
+    # {nome: {ticker: {...}}} -> {nome: resultado}. Métricas de todas as carteiras
+    # numa passada só (analise.analisar_lote); Ordem de Compra e alertas por carteira.
+    quadros = {nome: _quadro(c, precos) for nome, c in carteiras.items()}
+    df, resumos = analise.analisar_lote({nome: q[q['preco_atual'] > 0] for nome, q in quadros.items()})
+    resultados = {}
+    for nome, q in quadros.items():
+        res = {"resumo": {}, "sobra": float(aporte), "compras": [], "alertas": [],
+               "sem_cotacao": list(q.index[q['preco_atual'].isna()])}
+        if nome in resumos.index:
+            df_fim, sobra = calcular_compras(df.xs(nome, level='carteira'), aporte)
+            compra = df_fim[df_fim['comprar_qtd'] > 0].sort_values('custo_total', ascending=False)
+            # Coluna a coluna: a linha de resumos.loc viraria tudo float (ativos: 2.0)
+            res["resumo"] = {c: (int if pd.api.types.is_integer_dtype(resumos[c]) else float)(resumos.at[nome, c])
+                             for c in resumos.columns}
+            res["sobra"] = float(sobra)
+            res["compras"] = [{"ticker": t, "preco": float(l['preco_atual']), "qtd": int(l['comprar_qtd']), "custo": float(l['custo_total'])}
+                              for t, l in compra.iterrows()]
+            res["alertas"] = [{"ticker": t, "preco": float(l['preco_atual']), "teto": float(l['teto'])}
+                              for t, l in analise.oportunidades(df_fim).iterrows()]
+        resultados[nome] = res
+    return resultados
+
+
+# --- EXECUÇÃO PARALELA ---
+# Preços e aporte vão uma vez para cada processo (initializer); cada tarefa é
+# um bloco de carteiras, para o analisar_lote ter o que vetorizar
+_CONTEXTO = {}
+
+def _iniciar_processo(precos, aporte):
+    _CONTEXTO["precos"], _CONTEXTO["aporte"] = precos, aporte
+
+def _analisar_bloco(bloco):
+    try: return list(analisar(dict(bloco), _CONTEXTO["precos"], _CONTEXTO["aporte"]).items())
+    except Exception as e: return [(nome, {"erro": f"{type(e).__name__}: {e}"}) for nome, _ in bloco]
+
+def rodar_lote(carteiras, precos, aporte, processos=None):
+    # Gera (nome, resultado) na ordem das carteiras, bloco a bloco, conforme os processos terminam
+    itens = list(carteiras.items())
+    processos = min(processos or os.cpu_count() or 1, max(1, len(itens)))
+    tamanho = max(1, -(-len(itens) // (processos * 4)))
+    blocos = [itens[i:i + tamanho] for i in range(0, len(itens), tamanho)]
+    if processos == 1:
+        _iniciar_processo(precos, aporte)
+        for bloco in blocos: yield from _analisar_bloco(bloco)
+        return
+    with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo, initargs=(precos, aporte)) as pool:
+        for resultados in pool.map(_analisar_bloco, blocos): yield from resultados
+
+
+# --- SAÍDA ---
+def escrever_jsonl(resultados, saida):
+    for nome, res in resultados:
+        saida.write(json.dumps({"carteira": nome, **res}, ensure_ascii=False) + "\n")
+        saida.flush()
+
+def escrever_csv(resultados, saida):
+    # Uma linha por compra/alerta/erro, para abrir direto numa planilha
+    w = csv.writer(saida)
+    w.writerow(["carteira", "tipo", "ticker", "preco", "qtd", "valor"])
+    for nome, res in resultados:
+        if "erro" in res: w.writerow([nome, "erro", "", "", "", res["erro"]])
+        for c in res.get("compras", []): w.writerow([nome, "compra", c["ticker"], c["preco"], c["qtd"], round(c["custo"], 2)])
+        for a in res.get("alertas", []): w.writerow([nome, "alerta_teto", a["ticker"], a["preco"], "", a["teto"]])
+        for t in res.get("sem_cotacao", []): w.writerow([nome, "sem_cotacao", t, "", "", ""])
+        if "sobra" in res: w.writerow([nome, "caixa", "", "", "", round(res["sobra"], 2)])
+        saida.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Análise sniper (Ordem de Compra + alertas de teto) de várias carteiras, sem navegador")
+    parser.add_argument("fontes", nargs="+", help="arquivos .csv, bancos .db do app ou sheets:<chave da planilha>")
+    parser.add_argument("--aporte", type=float, default=1000.0)
+    parser.add_argument("--formato", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--saida", default="-", help="arquivo de saída (padrão: stdout)")
+    parser.add_argument("--processos", type=int, default=None)
+    parser.add_argument("--credenciais", default=os.environ.get("GOOGLE_APPLICATION_CREDENTIALS"),
+                        help="JSON da service account, para fontes sheets:")
+    args = parser.parse_args(argv)
+
+    carteiras, erros_fonte = carregar_fontes(args.fontes, args.credenciais)
+    for fonte, erro in erros_fonte.items(): print(f"Falha ao carregar {fonte}: {erro}", file=sys.stderr)
+    if not carteiras: return 1
+    precos, erros_cotacao = buscar_cotacoes(carteiras)
+    if erros_cotacao: print(f"Sem cotação para {len(erros_cotacao)} ativo(s): " + ", ".join(sorted(erros_cotacao)), file=sys.stderr)
+
+    escrever = escrever_csv if args.formato == "csv" else escrever_jsonl
+    resultados = rodar_lote(carteiras, precos, args.aporte, args.processos)
+    if args.saida == "-": escrever(resultados, sys.stdout)
+    else:
+        with open(args.saida, "w", encoding="utf-8", newline="") as f: escrever(resultados, f)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+import threading
+
+import gspread
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import ValueRenderOption, rowcol_to_a1
+from google.auth.exceptions import RefreshError
+from oauth2client.service_account import ServiceAccountCredentials
+
+from constantes import CONFIG_PADRAO
+from desempenho import rastreador
+
+# --- CONSTANTES ---
+NOME_PLANILHA_GOOGLE = "carteira_robo_db"
+ESCOPO = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+CABECALHO_CARTEIRA = ["Ticker", "Qtd", "Meta", "PM", "Divs", "Teto"]
+CABECALHO_CONFIG = ["Senha", "MetaMensal"]
+
+
+def erro_de_autenticacao(e):
+    if isinstance(e, RefreshError): return True
+    return isinstance(e, APIError) and getattr(e.response, "status_code", None) == 401
+
+
+# --- CONEXÃO DE LONGA DURAÇÃO ---
+# Autoriza uma vez e guarda planilha + abas. O token é renovado sozinho pela
+# sessão autorizada do gspread; só reconecta do zero se a autenticação falhar.
+class ConexaoSheets:
+    def __init__(self, creds_dict, chave=None, nome=NOME_PLANILHA_GOOGLE):
+        self.creds_dict = dict(creds_dict)
+        self.creds_dict["private_key"] = self.creds_dict["private_key"].replace("\\n", "\n")
+        self.chave = chave
+        self.nome = nome
+        self._sh = None
+        self._abas = {}
+        self._trava = threading.RLock()
+        self.autorizacoes = 0
+
+    def _autorizar(self):
+        with rastreador.etapa("sheets.autorizacao"):
+            creds = ServiceAccountCredentials.from_json_keyfile_dict(self.creds_dict, ESCOPO)
+            client = gspread.authorize(creds)
+            client.http_client.session.hooks["response"].append(self._contar_chamada)
+            self._sh = client.open_by_key(self.chave) if self.chave else client.open(self.nome)
+        self._abas = {}
+        self.autorizacoes += 1
+        rastreador.contar("sheets.autorizacoes")
+
+    @staticmethod
+    def _contar_chamada(resposta, *args, **kwargs):
+        # Hook do requests: toda chamada HTTP à API do Sheets passa por aqui
+        rastreador.contar("sheets.chamadas")
+        rastreador.contar(f"sheets.{resposta.request.method}")
+
+    def planilha(self):
+        with self._trava:
+            if self._sh is None: self._autorizar()
+            return self._sh
+
+    def reconectar(self):
+        with self._trava:
+            self._sh = None
+            self._abas = {}
+            return self.planilha()
+
+    def _aba(self, nome, criar):
+        with self._trava:
+            if nome not in self._abas: self._abas[nome] = criar(self.planilha())
+            return self._abas[nome]
+
+    def aba_carteira(self): return self._aba("carteira", pegar_aba_carteira)
+    def aba_config(self): return self._aba("config", pegar_aba_config)
+
+    def executar(self, operacao):
+        # operacao() deve pegar as abas pela conexão, para enxergar a reconexão
+        with rastreador.etapa("sheets.operacao"):
+            try: return operacao()
+            except (APIError, RefreshError) as e:
+                if not erro_de_autenticacao(e): raise
+                self.reconectar()
+                return operacao()
+
+
+# --- GERENCIAMENTO DE ABAS ---
+def pegar_aba_carteira(sh):
+    try: return sh.get_worksheet(0)
+    except WorksheetNotFound: return sh.add_worksheet(title="Carteira", rows=100, cols=10)
+
+def pegar_aba_config(sh):
+    try: return sh.worksheet("Config")
+    except WorksheetNotFound:
+        ws = sh.add_worksheet(title="Config", rows=5, cols=5)
+        ws.update([CABECALHO_CONFIG, [CONFIG_PADRAO["senha"], CONFIG_PADRAO["meta_mensal"]]])
+        return ws
+
+
+# --- CONVERSÃO LINHAS <-> CARTEIRA ---
+def carteira_de_registros(dados):
+    carteira = {}
+    for linha in dados:
+        t = linha['Ticker']
+        if not t: continue
+
+        # Tratamento robusto para valores vazios
+        qtde = linha.get('Qtd', 0); qtde = 0 if qtde == '' else int(qtde)
+        meta = linha.get('Meta', 0); meta = 0 if meta == '' else int(meta)
+
+        try: pm = float(str(linha.get('PM', 0)).replace(',', '.'))
+        except ValueError: pm = 0.0
+
+        try: divs = float(str(linha.get('Divs', 0)).replace(',', '.'))
+        except ValueError: divs = 0.0
+
+        try: teto = float(str(linha.get('Teto', 0)).replace(',', '.'))
+        except ValueError: teto = 0.0
+
+        carteira[t] = {'qtde': qtde, 'meta_pct': meta, 'pm': pm, 'divs': divs, 'teto': teto}
+    return carteira
+
+def registros_da_grade(grade):
+    # Equivalente ao get_all_records, a partir de uma leitura crua (get_all_values)
+    if not grade: return []
+    cabecalho = grade[0]
+    return [dict(zip(cabecalho, list(linha) + [""] * (len(cabecalho) - len(linha)))) for linha in grade[1:]]
+
+def linhas_da_carteira(carteira):
+    linhas = [list(CABECALHO_CARTEIRA)]
+    for t, dados in carteira.items():
+        linhas.append([
+            t,
+            dados['qtde'],
+            dados['meta_pct'],
+            dados.get('pm', 0.0),
+            dados.get('divs', 0.0),
+            dados.get('teto', 0.0)
+        ])
+    return linhas
+
+
+# --- CARREGAR/SALVAR ---
+def carregar_carteira(conexao):
+    dados = conexao.executar(lambda: conexao.aba_carteira().get_all_records())
+    return carteira_de_registros(dados)
+
+def carregar_config(conexao):
+    dados = conexao.executar(lambda: conexao.aba_config().get_all_records())
+    if not dados: return dict(CONFIG_PADRAO)
+    return {
+        "senha": str(dados[0].get('Senha', '123456')),
+        "meta_mensal": float(str(dados[0].get('MetaMensal', 1000)).replace(',', '.'))
+    }
+
+def salvar_config(conexao, conf):
+    def gravar():
+        ws = conexao.aba_config()
+        ws.clear()
+        ws.update([CABECALHO_CONFIG, [conf['senha'], conf['meta_mensal']]])
+    conexao.executar(gravar)
+
+
+# --- ESCRITA POR DIFERENÇA ---
+def _normalizar(v):
+    try: return float(str(v).replace(',', '.'))
+    except ValueError: return str(v)
+
+def diferencas(antigas, novas, largura):
+    # Só as células que mudaram, um intervalo por linha, no formato do batch_update.
+    # Linhas que sobraram no fim (ativos removidos) são apagadas com células vazias.
+    alteracoes = []
+    for r in range(max(len(antigas), len(novas))):
+        velha = (list(antigas[r]) if r < len(antigas) else []) + [""] * largura
+        nova = (list(novas[r]) if r < len(novas) else []) + [""] * largura
+        mudou = [c for c in range(largura) if _normalizar(velha[c]) != _normalizar(nova[c])]
+        if not mudou: continue
+        c0, c1 = mudou[0], mudou[-1]
+        alteracoes.append({
+            'range': f"{rowcol_to_a1(r + 1, c0 + 1)}:{rowcol_to_a1(r + 1, c1 + 1)}",
+            'values': [nova[c0:c1 + 1]]
+        })
+    return alteracoes
+
+class EscritaPorDiferenca:
+    # Grava só as células que mudaram desde a última grade conhecida da aba
+    # Carteira, numa única chamada batch_update. A espera por mais edições
+    # (debounce) fica com o sincronizador.
+    def __init__(self, conexao):
+        self.conexao = conexao
+        self._gravadas = None  # última grade conhecida da aba Carteira
+        self._trava = threading.Lock()
+        self.gravacoes = 0
+        self.celulas_gravadas = 0
+
+    def definir_base(self, grade):
+        # Grade recém-lida da aba: evita diff contra uma cópia desatualizada
+        with self._trava: self._gravadas = grade
+
+    def gravar(self, carteira):
+        # Retorna quantos intervalos foram gravados
+        novas = linhas_da_carteira(carteira)
+        with self._trava:
+            def gravar():
+                ws = self.conexao.aba_carteira()
+                if self._gravadas is None:
+                    self._gravadas = ws.get_all_values(value_render_option=ValueRenderOption.unformatted)
+                alteracoes = diferencas(self._gravadas, novas, len(CABECALHO_CARTEIRA))
+                if alteracoes: ws.batch_update(alteracoes)
+                return alteracoes
+
+            alteracoes = self.conexao.executar(gravar)
+            self._gravadas = novas
+            if alteracoes:
+                self.gravacoes += 1
+                self.celulas_gravadas += sum(len(a['values'][0]) for a in alteracoes)
+            return len(alteracoes)
@@ -0,0 +1,138 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import date, timedelta
+
+import pandas as pd
+
+# --- CONSTANTES ---
+CAMINHO_PROVENTOS = os.environ.get("ROBO_PROVENTOS", os.path.join("dados", "proventos.db"))
+INTERVALO_AUTOMATICO = 6 * 3600  # segundos entre ingestões automáticas
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS posicoes (
+    ticker TEXT NOT NULL,
+    data TEXT NOT NULL,
+    qtde INTEGER NOT NULL,
+    PRIMARY KEY (ticker, data)
+);
+CREATE TABLE IF NOT EXISTS eventos (
+    ticker TEXT NOT NULL,
+    data_ex TEXT NOT NULL,
+    valor_cota REAL NOT NULL,
+    qtde INTEGER NOT NULL,
+    recebido REAL NOT NULL,
+    PRIMARY KEY (ticker, data_ex)
+);
+CREATE TABLE IF NOT EXISTS controle (ticker TEXT PRIMARY KEY, ultima_data_ex TEXT NOT NULL);
+"""
+
+
+# --- LIVRO DE PROVENTOS ---
+# Dividendos/JCP por data-ex, vindos do armazém de histórico (que baixa em
+# lotes e só os pregões novos). Cada evento é creditado pela quantidade que
+# a carteira tinha na data-com (véspera da data-ex), segundo as fotos de posição gravadas a cada
+# salvamento; eventos já lançados nunca são recalculados. Proventos de antes
+# da primeira foto continuam sendo os digitados à mão na coluna Divs.
+class LivroProventos:
+    def __init__(self, caminho=CAMINHO_PROVENTOS):
+        self.caminho = caminho
+        pasta = os.path.dirname(caminho)
+        if pasta: os.makedirs(pasta, exist_ok=True)
+        with closing(self._conectar()) as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(ESQUEMA)
+        self._trava = threading.Lock()  # uma atualização por vez
+        self._trava_agenda = threading.Lock()
+        self._thread = None
+        self.ultima_automatica = None
+        self.ultimo_erro = None
+
+    def _conectar(self):
+        return sqlite3.connect(self.caminho, timeout=10)
+
+    # --- POSIÇÕES ---
+    def registrar_posicoes(self, qtdes, data=None):
+        # Grava a quantidade de hoje só dos tickers que mudaram desde a última foto
+        data = (data or date.today()).isoformat()
+        with closing(self._conectar()) as con, con:
+            ultimas = dict(con.execute(
+                "SELECT p.ticker, p.qtde FROM posicoes p JOIN (SELECT ticker, MAX(data) AS data FROM posicoes GROUP BY ticker) u "
+                "ON p.ticker = u.ticker AND p.data = u.data"))
+            mudaram = [(t, data, int(q)) for t, q in qtdes.items() if ultimas.get(t) != int(q)]
+            mudaram += [(t, data, 0) for t, q in ultimas.items() if t not in qtdes and q != 0]
+            if mudaram: con.executemany("INSERT OR REPLACE INTO posicoes (ticker, data, qtde) VALUES (?, ?, ?)", mudaram)
+            return len(mudaram)
+
+    def posicoes(self, ticker):
+        with closing(self._conectar()) as con:
+            linhas = con.execute("SELECT data, qtde FROM posicoes WHERE ticker = ? ORDER BY data", (ticker,)).fetchall()
+        return pd.Series({pd.Timestamp(d): q for d, q in linhas}, dtype="int64")
+
+    # --- INGESTÃO ---
+    def _pendentes(self, con, tickers):
+        # Para cada ticker: a partir de quando procurar eventos novos
+        controle = dict(con.execute("SELECT ticker, ultima_data_ex FROM controle"))
+        primeira = dict(con.execute("SELECT ticker, MIN(data) FROM posicoes GROUP BY ticker"))
+        inicio = {}
+        for t in tickers:
+            if t in controle: inicio[t] = date.fromisoformat(controle[t]) + timedelta(days=1)
+            elif t in primeira: inicio[t] = date.fromisoformat(primeira[t])
+        return inicio
+
+    def atualizar(self, historico, tickers):
+        # Retorna ({ticker: eventos novos}, {ticker: motivo da falha})
+        with self._trava:
+            with closing(self._conectar()) as con: inicio = self._pendentes(con, tickers)
+            if not inicio: return {}, {}
+            _, erros = historico.atualizar(list(inicio))
+            hoje = pd.Timestamp(date.today())
+            lancamentos, controle, novos = [], [], {}
+            for t, desde in inicio.items():
+                divs = historico.dividendos(t, inicio=pd.Timestamp(desde))
+                divs = divs[divs.index <= hoje]
+                novos[t] = len(divs)
+                if divs.empty: continue
+                # Quem compra na data-ex não recebe: vale a posição no fechamento da data-com
+                qtdes = self.posicoes(t).asof(divs.index - pd.Timedelta(days=1)).fillna(0).astype(int)
+                lancamentos += [(t, d.date().isoformat(), float(v), int(q), float(v) * int(q)) for d, v, q in zip(divs.index, divs, qtdes)]
+                controle.append((t, divs.index[-1].date().isoformat()))
+            with closing(self._conectar()) as con, con:
+                con.executemany("INSERT OR REPLACE INTO eventos (ticker, data_ex, valor_cota, qtde, recebido) VALUES (?, ?, ?, ?, ?)", lancamentos)
+                con.executemany("INSERT OR REPLACE INTO controle (ticker, ultima_data_ex) VALUES (?, ?)", controle)
+            return {t: n for t, n in novos.items() if n}, {t: e for t, e in erros.items() if t in inicio}
+
+    def tentar_atualizar(self, historico, tickers):
+        try:
+            resultado = self.atualizar(historico, tickers)
+            self.ultimo_erro = None
+            return resultado
+        except Exception as e:
+            self.ultimo_erro = e
+            return {}, {}
+
+    def agendar(self, historico, tickers, intervalo=INTERVALO_AUTOMATICO):
+        # Ingestão automática em segundo plano, no máximo uma por intervalo
+        with self._trava_agenda:
+            if self._thread is not None and self._thread.is_alive(): return False
+            if self.ultima_automatica is not None and time.time() - self.ultima_automatica < intervalo: return False
+            self.ultima_automatica = time.time()
+            self._thread = threading.Thread(target=self.tentar_atualizar, args=(historico, list(tickers)), name="proventos", daemon=True)
+            self._thread.start()
+            return True
+
+    # --- LEITURAS ---
+    def recebidos(self):
+        # Total recebido por ticker desde a primeira foto de posição
+        with closing(self._conectar()) as con:
+            linhas = con.execute("SELECT ticker, SUM(recebido) FROM eventos GROUP BY ticker").fetchall()
+        return pd.Series(dict(linhas), dtype=float)
+
+    def eventos(self, inicio=None):
+        with closing(self._conectar()) as con:
+            df = pd.read_sql_query("SELECT ticker, data_ex, valor_cota, qtde, recebido FROM eventos "
+                                   "WHERE data_ex >= ? ORDER BY data_ex DESC", con, params=(inicio or "0000",))
+        df['data_ex'] = pd.to_datetime(df['data_ex'])
+        return df
@@ -0,0 +1,78 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# --- SIMULADOR BOLA DE NEVE ---
+# Funções memoizadas pelos parâmetros: mexer no slider e voltar para um valor
+# já visto não recalcula nada. Os DataFrames devolvidos são compartilhados
+# entre chamadas e não devem ser alterados.
+
+CAMINHOS_PADRAO = 20_000
+BLOCO_CAMINHOS = 25_000  # limita a memória por bloco em simulações grandes
+
+
+def taxa_mensal(taxa_anual):
+    return (1 + taxa_anual / 100) ** (1 / 12) - 1
+
+
+# --- TRAJETÓRIA DETERMINÍSTICA (FÓRMULA FECHADA) ---
+@lru_cache(maxsize=128)
+def simular_deterministico(patr, aporte, taxa_anual, anos):
+    # Valor futuro de P com aportes mensais A: P*(1+r)^m + A*((1+r)^m - 1)/r
+    r = taxa_mensal(taxa_anual)
+    meses = np.arange(anos + 1) * 12
+    fator = (1 + r) ** meses
+    acumulado = patr * fator + (aporte * (fator - 1) / r if r != 0 else aporte * meses)
+    return pd.DataFrame({
+        "Ano": np.arange(anos + 1),
+        "Total Investido": patr + aporte * meses,
+        "Total Acumulado": acumulado,
+    })
+
+
+# --- MONTE CARLO (VETORIZADO) ---
+def _trajetorias_anuais(rng, patr, aporte, r, vol_anual, meses, caminhos, retornos):
+    # Avança todos os caminhos juntos mês a mês e guarda o patrimônio a cada ano.
+    # Sem histórico: retornos log-normais com média (1+r) ao mês e volatilidade
+    # anual vol_anual. Com histórico: reamostra (bootstrap) os retornos mensais.
+    sigma = vol_anual / 100 / np.sqrt(12)
+    mu = np.log1p(r) - sigma ** 2 / 2
+    # float32 e buffers reaproveitados: metade da memória e sem alocar por mês
+    total = np.full(caminhos, patr, dtype=np.float32)
+    fator = np.empty(caminhos, dtype=np.float32)
+    anuais = np.empty((meses // 12 + 1, caminhos), dtype=np.float32)
+    anuais[0] = total
+    metade_sorteio = (caminhos + 1) // 2
+    for m in range(1, meses + 1):
+        if retornos is None:
+            # Variáveis antitéticas: metade dos sorteios, espelhados (+z, -z)
+            rng.standard_normal(out=fator[:metade_sorteio], dtype=np.float32)
+            np.negative(fator[:caminhos - metade_sorteio], out=fator[metade_sorteio:])
+            fator *= sigma
+            fator += mu
+            np.exp(fator, out=fator)
+        else:
+            np.add(1, rng.choice(retornos, size=caminhos), out=fator, casting='unsafe')
+        total *= fator
+        total += aporte
+        if m % 12 == 0: anuais[m // 12] = total
+    return anuais
+
+@lru_cache(maxsize=64)
+def simular_monte_carlo(patr, aporte, taxa_anual, vol_anual, anos, caminhos=CAMINHOS_PADRAO, semente=42, retornos_mensais=None):
+    # retornos_mensais: tupla opcional de retornos mensais históricos da carteira
+    # (em fração); quando informada substitui o modelo log-normal.
+    rng = np.random.default_rng(semente)
+    retornos = None if retornos_mensais is None else np.asarray(retornos_mensais, dtype=float)
+    r = taxa_mensal(taxa_anual)
+    meses = anos * 12
+    blocos = [
+        _trajetorias_anuais(rng, patr, aporte, r, vol_anual, meses, min(BLOCO_CAMINHOS, caminhos - i), retornos)
+        for i in range(0, caminhos, BLOCO_CAMINHOS)
+    ]
+    anuais = np.concatenate(blocos, axis=1)
+    p10, p50, p90 = np.percentile(anuais, [10, 50, 90], axis=1)
+    df = simular_deterministico(patr, aporte, taxa_anual, anos).copy()
+    df["P10"], df["P50"], df["P90"] = p10, p50, p90
+    return df
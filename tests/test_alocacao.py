@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+from alocacao import calcular_compras
+
+
+# --- REFERÊNCIA ---
+# Regra original (uma cota por iteração sobre o DataFrame inteiro): o motor com
+# heap tem que gerar exatamente a mesma lista de compras e a mesma sobra.
+def calcular_compras_referencia(df, aporte):
+    caixa = aporte
+    df = df.copy()
+    df['comprar_qtd'] = 0
+    df['custo_total'] = 0.0
+    if df['meta_pct'].sum() == 0: return df, caixa
+    while caixa > 0:
+        patr_sim = (df['qtde']*df['preco_atual']).sum() + (df['comprar_qtd']*df['preco_atual']).sum() + caixa
+        if patr_sim == 0: break
+        df['pct_sim'] = ((df['qtde']+df['comprar_qtd'])*df['preco_atual']/patr_sim)*100
+        df['gap'] = df['meta_pct'] - df['pct_sim']
+        cand = df[(df['preco_atual'] <= caixa) & (df['gap'] > 0)]
+        if cand.empty: break
+        melhor = cand['gap'].idxmax()
+        preco = df.loc[melhor, 'preco_atual']
+        df.loc[melhor, 'comprar_qtd'] += 1
+        df.loc[melhor, 'custo_total'] += preco
+        caixa -= preco
+    return df, caixa
+
+
+def _carteira(qtdes, metas, precos):
+    tickers = [f"T{i:03d}" for i in range(len(precos))]
+    return pd.DataFrame({'qtde': qtdes, 'meta_pct': metas, 'preco_atual': precos}, index=tickers)
+
+def _comparar(df, aporte):
+    res, sobra = calcular_compras(df, aporte)
+    ref, sobra_ref = calcular_compras_referencia(df, aporte)
+    assert res['comprar_qtd'].tolist() == ref['comprar_qtd'].tolist()
+    np.testing.assert_allclose(res['custo_total'].to_numpy(), ref['custo_total'].to_numpy())
+    assert sobra == sobra_ref
+    return res, sobra
+
+
+# --- EQUIVALÊNCIA COM A REGRA ORIGINAL ---
+def test_carteiras_aleatorias():
+    rng = np.random.default_rng(42)
+    for _ in range(300):
+        n = int(rng.integers(1, 12))
+        df = _carteira(rng.integers(0, 200, n), rng.integers(0, 25, n), rng.uniform(1, 120, n).round(2))
+        _comparar(df, float(rng.choice([0.0, 50.0, 300.0, 1_000.0])))
+
+def test_precos_fracionados_com_gap_em_cima_do_zero():
+    # Preços como 0.1 e 1.1 fazem o gap cair exatamente no zero e o caixa
+    # acumular erro de arredondamento: a fronteira tem que bater com o loop
+    rng = np.random.default_rng(7)
+    for _ in range(150):
+        n = int(rng.integers(1, 5))
+        precos = rng.choice([0.1, 0.2, 0.3, 0.7, 1.0, 1.1, 2.5, 3.3], n)
+        df = _carteira(rng.integers(0, 30, n), rng.integers(0, 50, n), precos)
+        _comparar(df, float(rng.choice([0.9, 3.3, 7.7, 10.0, 12.1])))
+
+def test_gap_zerado_pelo_arredondamento_do_caixa():
+    res, _ = _comparar(_carteira([0], [12], [0.1]), 10.0)
+    assert res['comprar_qtd'].tolist() == [13]
+    res, _ = _comparar(_carteira([13, 5], [33, 36], [1.1, 0.1]), 7.7)
+    assert res['comprar_qtd'].tolist() == [0, 77]
+
+def test_aporte_zero_ou_negativo_nao_compra():
+    df = _carteira([10, 5], [50, 50], [10.0, 20.0])
+    for aporte in (0.0, -100.0):
+        res, sobra = _comparar(df, aporte)
+        assert res['comprar_qtd'].sum() == 0
+        assert sobra == aporte
+
+def test_metas_zeradas_nao_compra():
+    res, sobra = _comparar(_carteira([10, 5], [0, 0], [10.0, 20.0]), 1_000.0)
+    assert res['comprar_qtd'].sum() == 0
+    assert sobra == 1_000.0
+
+def test_empate_fica_com_o_primeiro():
+    # Mesmo gap e mesmo preço: a cota ímpar vai para o primeiro da carteira
+    res, _ = _comparar(_carteira([0, 0, 0], [30, 30, 30], [10.0, 10.0, 10.0]), 50.0)
+    assert res['comprar_qtd'].tolist() == [2, 2, 1]
+
+def test_precos_iguais_metas_diferentes():
+    _comparar(_carteira([3, 0, 7, 1], [40, 10, 30, 20], [25.0, 25.0, 25.0, 25.0]), 1_000.0)
+
+def test_preco_acima_do_caixa_fica_de_fora():
+    # O ativo de R$ 10 para na meta (50% de R$ 100); o de R$ 500 nunca cabe
+    res, sobra = _comparar(_carteira([0, 0], [50, 50], [500.0, 10.0]), 100.0)
+    assert res['comprar_qtd'].tolist() == [0, 5]
+    assert sobra == 50.0
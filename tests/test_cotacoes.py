@@ -0,0 +1,62 @@
+import time
+
+import pytest
+
+import cotacoes
+from benchmarks.stubs import ServidorYahooFalso
+
+
+@pytest.fixture
+def yahoo(monkeypatch):
+    # Servidor local no lugar do Yahoo; cada teste configura o seu
+    servidores = []
+    def criar(**kwargs):
+        srv = ServidorYahooFalso(**kwargs).__enter__()
+        servidores.append(srv)
+        monkeypatch.setattr(cotacoes, "URL_YAHOO", srv.url)
+        return srv
+    yield criar
+    for srv in servidores: srv.__exit__(None, None, None)
+
+
+# --- ERROS POR TICKER ---
+def test_404_vira_erro_sem_repetir(yahoo):
+    srv = yahoo(latencia=0, precos={"PETR4": 37.5})
+    precos, erros = cotacoes.obter_precos(["PETR4", "ERRO1"], backoff=0)
+    assert precos == {"PETR4": 37.5}
+    assert erros == {"ERRO1": "HTTP 404"}
+    assert srv.por_ticker["ERRO1"] == 1
+
+@pytest.mark.parametrize("codigo", [500, 503, 429])
+def test_falha_temporaria_e_repetida(yahoo, codigo):
+    srv = yahoo(latencia=0, precos={"VALE3": 61.0}, roteiro={"VALE3": [codigo, codigo]})
+    precos, erros = cotacoes.obter_precos(["VALE3"], tentativas=3, backoff=0)
+    assert precos == {"VALE3": 61.0} and not erros
+    assert srv.por_ticker["VALE3"] == 3
+
+def test_falha_persistente_esgota_tentativas(yahoo):
+    srv = yahoo(latencia=0, roteiro={"ITUB4": [429] * 5})
+    precos, erros = cotacoes.obter_precos(["ITUB4"], tentativas=3, backoff=0)
+    assert not precos
+    assert erros == {"ITUB4": "HTTP 429"}
+    assert srv.por_ticker["ITUB4"] == 3
+
+def test_tickers_repetidos_buscam_uma_vez(yahoo):
+    srv = yahoo(latencia=0)
+    precos, _ = cotacoes.obter_precos(["WEGE3", "WEGE3", "WEGE3"])
+    assert list(precos) == ["WEGE3"]
+    assert srv.requisicoes == 1
+
+
+# --- CONCORRÊNCIA ---
+def test_lote_concorrente_mais_rapido_que_serial(yahoo):
+    yahoo(latencia=0.05)
+    tickers = [f"T{i:02d}3" for i in range(16)]
+    t0 = time.perf_counter()
+    for t in tickers: cotacoes.buscar_preco(t)
+    serial = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    precos, erros = cotacoes.obter_precos(tickers)
+    concorrente = time.perf_counter() - t0
+    assert len(precos) == 16 and not erros
+    assert concorrente < serial / 3
@@ -0,0 +1,48 @@
+import lote
+from armazenamento import ArmazenamentoLocal
+
+
+# --- FONTES ---
+def test_csv_com_cabecalho_parcial(tmp_path):
+    # Só Ticker, Qtd e Meta: o resto entra zerado, como no parser da planilha
+    arquivo = tmp_path / "parcial.csv"
+    arquivo.write_text("Ticker,Qtd,Meta\npetr4.SA,10,50\nVALE3,,30\n", encoding="utf-8")
+    assert lote.carregar_csv(str(arquivo)) == {
+        "PETR4": {"qtde": 10, "meta_pct": 50, "pm": 0.0, "divs": 0.0, "teto": 0.0},
+        "VALE3": {"qtde": 0, "meta_pct": 30, "pm": 0.0, "divs": 0.0, "teto": 0.0},
+    }
+
+def test_csv_com_virgula_decimal(tmp_path):
+    arquivo = tmp_path / "completo.csv"
+    arquivo.write_text('ticker,qtde,meta_pct,pm,divs,teto\nITUB4,5,20,"31,5","1,25",30\n', encoding="utf-8")
+    assert lote.carregar_csv(str(arquivo))["ITUB4"] == {"qtde": 5, "meta_pct": 20, "pm": 31.5, "divs": 1.25, "teto": 30.0}
+
+def test_banco_inexistente_e_erro(tmp_path):
+    caminho = tmp_path / "nao_existe.db"
+    carteiras, erros = lote.carregar_fontes([str(caminho)])
+    assert not carteiras and str(caminho) in erros
+    assert not caminho.exists()
+
+def test_banco_local(tmp_path):
+    caminho = str(tmp_path / "carteira.db")
+    ArmazenamentoLocal(caminho).salvar_carteira({"WEGE3": {"qtde": 3, "meta_pct": 10, "pm": 40.0, "divs": 0.0, "teto": 0.0}})
+    carteiras, erros = lote.carregar_fontes([caminho])
+    assert not erros and carteiras == {"carteira": {"WEGE3": {"qtde": 3, "meta_pct": 10, "pm": 40.0, "divs": 0.0, "teto": 0.0}}}
+
+
+# --- ANÁLISE ---
+def test_lote_igual_em_serie_e_em_paralelo():
+    carteiras = {
+        "a": {"PETR4": {"qtde": 10, "meta_pct": 50, "pm": 30.0, "divs": 0.0, "teto": 40.0},
+              "VALE3": {"qtde": 5, "meta_pct": 50, "pm": 60.0, "divs": 0.0, "teto": 0.0}},
+        "b": {"ITUB4": {"qtde": 0, "meta_pct": 100, "pm": 0.0, "divs": 0.0, "teto": 0.0},
+              "SEMCOT3": {"qtde": 1, "meta_pct": 10, "pm": 1.0, "divs": 0.0, "teto": 0.0}},
+    }
+    precos = {"PETR4": 35.0, "VALE3": 55.0, "ITUB4": 30.0}
+    serie = dict(lote.rodar_lote(carteiras, precos, 1_000.0, processos=1))
+    assert dict(lote.rodar_lote(carteiras, precos, 1_000.0, processos=2)) == serie
+    assert [a["ticker"] for a in serie["a"]["alertas"]] == ["PETR4"]
+    assert serie["b"]["sem_cotacao"] == ["SEMCOT3"]
+    assert serie["b"]["compras"] == [{"ticker": "ITUB4", "preco": 30.0, "qtd": 33, "custo": 990.0}]
+    assert type(serie["a"]["resumo"]["ativos"]) is int and serie["a"]["resumo"]["ativos"] == 2
+    assert type(serie["a"]["resumo"]["patrimonio"]) is float
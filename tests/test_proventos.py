@@ -0,0 +1,63 @@
+from datetime import date
+
+import pandas as pd
+
+from proventos import LivroProventos
+
+
+class HistoricoFalso:
+    # Só a parte do ArmazemHistorico que o livro usa
+    def __init__(self, dividendos):
+        self._dividendos = {t: pd.Series(v, dtype=float).rename(index=pd.Timestamp).sort_index() for t, v in dividendos.items()}
+        self.pedidos = []
+
+    def atualizar(self, tickers):
+        self.pedidos.append(list(tickers))
+        return {}, {}
+
+    def dividendos(self, ticker, inicio=None):
+        d = self._dividendos.get(ticker, pd.Series(dtype=float))
+        return d if inicio is None else d[d.index >= inicio]
+
+
+def test_credita_pela_posicao_da_data_com(tmp_path):
+    livro = LivroProventos(str(tmp_path / "proventos.db"))
+    livro.registrar_posicoes({'PETR4': 100}, data=date(2025, 1, 2))
+    # Compra feita na própria data-ex não recebe o provento
+    livro.registrar_posicoes({'PETR4': 150}, data=date(2025, 3, 10))
+    historico = HistoricoFalso({'PETR4': {'2025-03-10': 1.0, '2025-06-10': 0.5}})
+
+    novos, erros = livro.atualizar(historico, ['PETR4'])
+    assert novos == {'PETR4': 2} and erros == {}
+    eventos = livro.eventos().set_index('data_ex')
+    assert eventos.loc[pd.Timestamp('2025-03-10'), 'qtde'] == 100
+    assert eventos.loc[pd.Timestamp('2025-06-10'), 'qtde'] == 150
+    assert livro.recebidos()['PETR4'] == 100 * 1.0 + 150 * 0.5
+
+def test_segunda_atualizacao_nao_duplica(tmp_path):
+    livro = LivroProventos(str(tmp_path / "proventos.db"))
+    livro.registrar_posicoes({'PETR4': 100}, data=date(2025, 1, 2))
+    historico = HistoricoFalso({'PETR4': {'2025-03-10': 1.0}})
+    livro.atualizar(historico, ['PETR4'])
+
+    assert livro.atualizar(historico, ['PETR4']) == ({}, {})
+    assert len(livro.eventos()) == 1
+    assert livro.recebidos()['PETR4'] == 100.0
+
+def test_ticker_sem_foto_de_posicao_nao_e_consultado(tmp_path):
+    livro = LivroProventos(str(tmp_path / "proventos.db"))
+    historico = HistoricoFalso({'VALE3': {'2025-03-10': 1.0}})
+    assert livro.atualizar(historico, ['VALE3']) == ({}, {})
+    assert historico.pedidos == []
+
+def test_fotos_so_quando_a_posicao_muda(tmp_path):
+    livro = LivroProventos(str(tmp_path / "proventos.db"))
+    assert livro.registrar_posicoes({'PETR4': 100, 'VALE3': 10}, data=date(2025, 1, 2)) == 2
+    assert livro.registrar_posicoes({'PETR4': 100, 'VALE3': 10}, data=date(2025, 1, 3)) == 0
+    # Ticker que saiu da carteira fica registrado com posição zero
+    assert livro.registrar_posicoes({'PETR4': 100}, data=date(2025, 2, 1)) == 1
+    assert livro.posicoes('VALE3').to_dict() == {pd.Timestamp('2025-01-02'): 10, pd.Timestamp('2025-02-01'): 0}
+    assert livro.registrar_posicoes({'PETR4': 100}, data=date(2025, 2, 2)) == 0
+
+    livro.atualizar(HistoricoFalso({'VALE3': {'2025-03-10': 1.0}}), ['VALE3'])
+    assert livro.recebidos()['VALE3'] == 0.0
@@ -0,0 +1,104 @@
+from armazenamento import ArmazenamentoLocal, ArmazenamentoSheets, SincronizadorSheets, mesclar
+from benchmarks.stubs import ConexaoFalsa
+from planilha import EscritaPorDiferenca, carteira_de_registros, diferencas, linhas_da_carteira, registros_da_grade
+
+
+def _ativo(qtde, meta=10, pm=10.0):
+    return {'qtde': qtde, 'meta_pct': meta, 'pm': pm, 'divs': 0.0, 'teto': 0.0}
+
+def _na_aba(conexao):
+    return carteira_de_registros(registros_da_grade(conexao.carteira.get_all_values()))
+
+
+# --- MESCLA DE TRÊS VIAS ---
+def test_edicao_so_local_ou_so_remota():
+    base = {'A': 1, 'B': 1}
+    assert mesclar(base, {'A': 2, 'B': 1}, base) == ({'A': 2, 'B': 1}, [])
+    assert mesclar(base, base, {'A': 1, 'B': 3}) == ({'A': 1, 'B': 3}, [])
+
+def test_conflito_fica_com_o_local():
+    resultado, conflitos = mesclar({'A': 1}, {'A': 2}, {'A': 3})
+    assert resultado == {'A': 2} and conflitos == ['A']
+
+def test_remocao_de_cada_lado():
+    base = {'A': 1, 'B': 1, 'C': 1}
+    assert mesclar(base, {'A': 1, 'C': 1}, base) == ({'A': 1, 'C': 1}, [])
+    assert mesclar(base, base, {'A': 1, 'B': 1}) == ({'A': 1, 'B': 1}, [])
+
+def test_sem_base_junta_os_dois_lados():
+    assert mesclar(None, {'A': 1}, {'B': 2}) == ({'A': 1, 'B': 2}, [])
+
+
+# --- SINCRONIZADOR ---
+def test_sincronia_mescla_e_grava_a_diferenca(tmp_path):
+    conexao = ConexaoFalsa({'PETR4': _ativo(10), 'VALE3': _ativo(5)})
+    local = ArmazenamentoLocal(str(tmp_path / "carteira.db"))
+    sinc = SincronizadorSheets(local, ArmazenamentoSheets(conexao))
+    assert sinc.sincronizar()
+    assert local.carregar_carteira() == _na_aba(conexao)
+
+    # Edição local e remota em ativos diferentes: as duas sobrevivem
+    local.salvar_carteira({'PETR4': _ativo(20), 'VALE3': _ativo(5), 'ITUB4': _ativo(1)})
+    conexao.carteira.grade[2][1] = "7"
+    assert sinc.sincronizar() and not sinc.conflitos
+    esperado = {'PETR4': _ativo(20), 'VALE3': _ativo(7), 'ITUB4': _ativo(1)}
+    assert local.carregar_carteira() == esperado == _na_aba(conexao)
+    assert conexao.carteira.chamadas.get("update", 0) == 0
+
+def test_edicao_durante_a_sincronia_aborta_a_rodada(tmp_path):
+    conexao = ConexaoFalsa({'PETR4': _ativo(10)})
+    local = ArmazenamentoLocal(str(tmp_path / "carteira.db"))
+    remoto = ArmazenamentoSheets(conexao)
+    sinc = SincronizadorSheets(local, remoto)
+    assert sinc.sincronizar()
+    base = local.base()
+
+    local.salvar_carteira({'PETR4': _ativo(11)})
+    ler = remoto.carregar_carteira
+    def ler_e_editar():
+        # O usuário salva de novo enquanto a planilha está sendo lida
+        lida = ler()
+        local.salvar_carteira({'PETR4': _ativo(12)})
+        return lida
+    remoto.carregar_carteira = ler_e_editar
+
+    assert not sinc.sincronizar()
+    assert local.carregar_carteira() == {'PETR4': _ativo(12)}
+    assert local.base() == base
+    assert "batch_update" not in conexao.carteira.chamadas
+    assert _na_aba(conexao) == {'PETR4': _ativo(10)}
+
+
+# --- ESCRITA POR DIFERENÇA ---
+def test_diferencas_ao_incluir_no_fim():
+    antigas = linhas_da_carteira({'A': _ativo(1)})
+    novas = linhas_da_carteira({'A': _ativo(1), 'B': _ativo(2)})
+    assert diferencas(antigas, novas, 6) == [{'range': 'A3:F3', 'values': [novas[2]]}]
+
+def test_diferencas_ao_remover_do_meio():
+    antigas = linhas_da_carteira({'A': _ativo(1), 'B': _ativo(2), 'C': _ativo(3)})
+    novas = linhas_da_carteira({'A': _ativo(1), 'C': _ativo(3)})
+    # B3 e C3 mudam (a linha sobe); a última linha é apagada
+    assert diferencas(antigas, novas, 6) == [
+        {'range': 'A3:B3', 'values': [['C', 3]]},
+        {'range': 'A4:F4', 'values': [[""] * 6]},
+    ]
+
+def test_diferencas_ignoram_linhas_vazias_no_fim():
+    antigas = linhas_da_carteira({'A': _ativo(1)}) + [[""] * 6, [""] * 6]
+    novas = linhas_da_carteira({'A': _ativo(1)})
+    assert diferencas(antigas, novas, 6) == []
+
+def test_texto_com_virgula_nao_conta_como_mudanca():
+    antigas = [['Ticker', 'Qtd', 'Meta', 'PM', 'Divs', 'Teto'], ['A', '1', '10', '10,0', '0', '0']]
+    assert diferencas(antigas, linhas_da_carteira({'A': _ativo(1)}), 6) == []
+
+def test_escrita_aplicada_na_aba():
+    conexao = ConexaoFalsa({'A': _ativo(1), 'B': _ativo(2), 'C': _ativo(3)})
+    escrita = EscritaPorDiferenca(conexao)
+    assert escrita.gravar({'A': _ativo(1), 'C': _ativo(4), 'D': _ativo(5)}) == 2
+    assert _na_aba(conexao) == {'A': _ativo(1), 'C': _ativo(4), 'D': _ativo(5)}
+    assert escrita.gravar({'A': _ativo(1)}) == 2
+    assert _na_aba(conexao) == {'A': _ativo(1)}
+    # As linhas de baixo foram apagadas, não sobram tickers vazios no meio
+    assert len(conexao.carteira.get_all_values()) == 2